@@ -1,8 +1,12 @@
+from src.abstract_domains.feasibility import get_feasibility_cache
+from src.abstract_domains.interchange import dump_preconditions, load_preconditions
 from src.buckets import Buckets
 from src.input_bounds import read_input_bounds
-from src.manager import run_engine_each_bucket, run_analysis_each_variable
+from src.manager import run_adaptive_engine_each_bucket, run_engine_each_bucket, run_analyses_each_variable, impacts_report
 from src.program import read_program
 from src.utils.cli import cli_helper
+from src.utils.lp import lp_stats_report
+from src.utils.string import add_prefix_each_line, from_variable_to_harmonic
 from src.engines.engines_picker import choose_engine
 from src.impacts.impacts_picker import choose_analysis
 
@@ -13,19 +17,40 @@ def main(raw_args: list[str] | None = None):
   buckets = Buckets(args.buckets)
   program = read_program(args.program)
   Engine = choose_engine(args.engine)
-  Analysis = choose_analysis(args.analysis)
+  Analyses = {name: choose_analysis(name) for name in args.analysis.split(',')}
   if args.interest:
     variables_of_interest = [args.interest]
   else:
     variables_of_interest = program.get_variables()
 
   # retrieve the input-output observations from the engine
-  loaded_engine = Engine(program, inputs)
-  preconditions = run_engine_each_bucket(loaded_engine, buckets)
+  if args.load_preconditions:
+    if buckets.adaptive:
+      raise Exception('Cannot load preconditions for adaptive buckets, their refinement depends on the engine results')
+    preconditions = load_preconditions(args.load_preconditions)
+    if len(preconditions) != len(list(buckets)):
+      raise Exception(f'{args.load_preconditions} holds {len(preconditions)} preconditions, expected one per bucket')
+  else:
+    loaded_engine = Engine(program, inputs)
+    try:
+      if buckets.adaptive:
+        harmonic_variables = [from_variable_to_harmonic(v) for v in variables_of_interest]
+        preconditions = run_adaptive_engine_each_bucket(loaded_engine, buckets, harmonic_variables, args.jobs)
+      else:
+        preconditions = run_engine_each_bucket(loaded_engine, buckets, args.jobs)
+    finally:
+      loaded_engine.close()
+  if args.dump_preconditions:
+    dump_preconditions(args.dump_preconditions, preconditions)
 
-  # run the analysis
-  loaded_analysis = Analysis(preconditions, buckets)
-  results = run_analysis_each_variable(loaded_analysis, variables_of_interest)
+  # run the analyses, sharing the projections of each variable
+  loaded_analyses = {name: Analysis(preconditions, buckets) for name, Analysis in Analyses.items()}
+  results = run_analyses_each_variable(loaded_analyses, variables_of_interest, args.jobs)
+  if len(loaded_analyses) > 1:
+    print('Impacts:\n' + add_prefix_each_line(impacts_report(results)))
+  if args.lp_stats:
+    print('LP solvers:\n' + add_prefix_each_line(lp_stats_report()))
+    print(f'Feasibility cache: {get_feasibility_cache()}')
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
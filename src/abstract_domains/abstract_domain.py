@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+from src.abstract_domains.boxes import Box
+
 
 class AbstractDomain(ABC):
   @abstractmethod
@@ -14,8 +16,12 @@ class AbstractDomain(ABC):
     intersected = self.intersect(other)
     return not intersected.is_bottom()
 
+  def bounding_box(self, lp: bool = False) -> Box | None:
+    """ Box containing every point of the element, None if unknown """
+    return None
+
   @abstractmethod
-  def eliminate(self, variable: str) -> 'AbstractDomain':
+  def eliminate(self, variable: str | list[str]) -> 'AbstractDomain':
     pass
 
   @abstractmethod
@@ -0,0 +1,73 @@
+""" Interval hulls of polyhedra, used to skip the feasibility checks of
+intersections between polyhedra that are far apart.
+
+A box is a pair (lower, upper) of arrays with one entry per variable, with
+infinite entries for unbounded directions. None stands for an unknown box,
+which overlaps everything.
+"""
+import numpy as np
+
+
+Box = tuple[np.ndarray, np.ndarray]
+
+def variable_bounds(A: np.ndarray, b: np.ndarray, atol: float = 1e-10) -> Box:
+  """ Box given by the rows of A x <= b over a single variable """
+  n = A.shape[1]
+  nonzero = np.abs(A) >= atol
+  single = nonzero.sum(axis=1) == 1
+  rows, columns = np.nonzero(nonzero[single])
+  coefficients = A[single][rows, columns]
+  values = b[single][rows] / coefficients
+  positive = coefficients > 0
+  lower, upper = np.full(n, -np.inf), np.full(n, np.inf)
+  np.minimum.at(upper, columns[positive], values[positive])
+  np.maximum.at(lower, columns[~positive], values[~positive])
+  return lower, upper
+
+def hull(boxes: list[Box | None]) -> Box | None:
+  if len(boxes) == 0 or any(box is None for box in boxes):
+    return None
+  return np.min([box[0] for box in boxes], axis=0), np.max([box[1] for box in boxes], axis=0) # type: ignore
+
+def overlaps(this: Box | None, other: Box | None, atol: float = 1e-9) -> bool:
+  if this is None or other is None:
+    return True
+  return bool(np.all(this[0] <= other[1] + atol) and np.all(other[0] <= this[1] + atol))
+
+def overlaps_each(this: Box | None, others: list[Box | None], atol: float = 1e-9) -> np.ndarray:
+  """ Mask of the boxes in others that overlap this """
+  return np.array([overlaps(this, other, atol) for other in others], dtype=bool)
+
+def overlapping_pairs(boxes: list[Box | None], atol: float = 1e-9) -> list[tuple[int, int]]:
+  """ Pairs (i, j), i < j, of overlapping boxes, found with a sweep line """
+  pairs = set()
+  unknown = [i for i, box in enumerate(boxes) if box is None]
+  for i in unknown:
+    pairs |= {(min(i, j), max(i, j)) for j in range(len(boxes)) if j != i}
+
+  known = [i for i, box in enumerate(boxes) if box is not None]
+  if len(known) < 2:
+    return sorted(pairs)
+  lower = np.array([boxes[i][0] for i in known]) # type: ignore
+  upper = np.array([boxes[i][1] for i in known]) # type: ignore
+  if lower.shape[1] == 0:
+    return sorted(pairs | {(i, j) for i in known for j in known if i < j})
+
+  # sweep along the direction where the boxes are the most spread out
+  with np.errstate(invalid='ignore'):
+    finite = np.where(np.isfinite(lower), lower, np.nan)
+    spread = np.nan_to_num(np.nanstd(finite, axis=0), nan=-1.) if np.isfinite(lower).any() else np.zeros(lower.shape[1])
+  axis = int(np.argmax(spread))
+
+  active: list[int] = []
+  for k in np.argsort(lower[:, axis], kind='stable'):
+    # boxes ending before this one starts cannot overlap anything that follows
+    active = [a for a in active if upper[a, axis] + atol >= lower[k, axis]]
+    if len(active) > 0:
+      candidates = np.array(active)
+      overlapping = np.all((lower[candidates] <= upper[k] + atol) & (lower[k] <= upper[candidates] + atol), axis=1)
+      for a in candidates[overlapping]:
+        i, j = known[a], known[k]
+        pairs.add((min(i, j), max(i, j)))
+    active.append(k)
+  return sorted(pairs)
@@ -0,0 +1,102 @@
+""" Counting the integer points of a polyhedron A x <= b inside a box.
+
+The variables are fixed one at a time, from a frontier of residual systems
+b - A[:, :k] x[:k]: prefixes leaving the same residual have the same number
+of completions, so the frontier keeps each residual once, with the number of
+prefixes reaching it. Residuals that interval arithmetic over the remaining
+box proves infeasible are dropped, and the last variable is counted in
+closed form, as the length of the interval its rows leave.
+"""
+from math import prod
+
+import numpy as np
+
+from src.abstract_domains.boxes import variable_bounds
+
+
+# frontier rows times constraint rows expanded at once
+CHUNK_SIZE = 1 << 22
+
+def integer_box(lower: np.ndarray, upper: np.ndarray, atol: float = 1e-6) -> tuple[np.ndarray, np.ndarray]:
+  """ Smallest integer box containing the integer points of [lower, upper] """
+  return np.ceil(lower - atol), np.floor(upper + atol)
+
+def lowest(A: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+  """ Minimum of each row of A x over the box [lower, upper] """
+  return (np.where(A > 0, A * lower, 0) + np.where(A < 0, A * upper, 0)).sum(axis=1)
+
+def merge(residuals: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  """ Keep each residual once, summing the weights of its copies """
+  residuals = np.round(residuals, 9) + 0. # -0. and 0. merge alike
+  unique, inverse = np.unique(residuals, axis=0, return_inverse=True)
+  merged = np.zeros(len(unique), dtype=weights.dtype)
+  np.add.at(merged, inverse.reshape(-1), weights)
+  return unique, merged
+
+def count_last(column: np.ndarray, residuals: np.ndarray, lower: float, upper: float, atol: float = 1e-9) -> np.ndarray:
+  """ Number of integers x in [lower, upper] with column x <= r, for each
+  residual r """
+  positive, negative, zero = column > atol, column < -atol, np.abs(column) <= atol
+  with np.errstate(divide='ignore', invalid='ignore'):
+    bounds = (residuals + atol) / column
+  highest = np.floor(np.min(np.where(positive, bounds, np.inf), axis=1, initial=np.inf))
+  least = np.ceil(np.max(np.where(negative, bounds, -np.inf), axis=1, initial=-np.inf))
+  counts = np.minimum(highest, upper) - np.maximum(least, lower) + 1
+  counts[np.any(zero & (residuals < -atol), axis=1)] = 0
+  return np.maximum(counts, 0).astype(np.int64)
+
+def count_integer_points(A: np.ndarray, b: np.ndarray, lower: np.ndarray, upper: np.ndarray, atol: float = 1e-9) -> int:
+  """ Number of integer points x in the box [lower, upper] with A x <= b """
+  n = A.shape[1]
+  nonzero = (np.abs(A) > atol).sum(axis=1)
+  # rows over no variable hold or not whatever x
+  if np.any(b[nonzero == 0] < -atol):
+    return 0
+  # rows over a single variable only narrow the box, they are dropped below
+  single_lower, single_upper = variable_bounds(A, b, atol)
+  lower, upper = integer_box(np.maximum(lower, single_lower), np.minimum(upper, single_upper))
+  if np.any(lower > upper):
+    return 0
+  if n == 0:
+    return 1
+  # enumerate the narrow variables, count the widest one in closed form
+  order = np.argsort(upper - lower, kind='stable')
+  A, lower, upper = A[:, order], lower[order], upper[order]
+
+  # rows bounding a single variable are now part of the box
+  multiple = nonzero > 1
+  A, b = A[multiple], b[multiple]
+  # counts past 64 bits need python integers
+  widths = [int(w) for w in upper - lower + 1]
+  dtype = np.int64 if prod(widths) < 1 << 62 else object
+  residuals, weights = b.reshape(1, -1), np.ones(1, dtype=dtype)
+  for k in range(n - 1):
+    if len(b) == 0:
+      # nothing constrains the variables left
+      return int(weights.sum()) * prod(widths[k:])
+    values = np.arange(lower[k], upper[k] + 1)
+    # rows left with no variable after k are checked now and dropped
+    active = np.any(np.abs(A[:, k + 1:]) > atol, axis=1)
+    # what the variables after k can contribute at least, and at most
+    least = lowest(A[active, k + 1:], lower[k + 1:], upper[k + 1:])
+    most = -lowest(-A[active, k + 1:], lower[k + 1:], upper[k + 1:])
+    step = max(1, CHUNK_SIZE // max(1, len(values) * len(b)))
+    expanded, expanded_weights = [], []
+    for start in range(0, len(residuals), step):
+      chunk = residuals[start:start + step]
+      candidates = (chunk[:, None, :] - values[None, :, None] * A[:, k]).reshape(-1, len(b))
+      feasible = np.all(candidates[:, ~active] >= -atol, axis=1) & np.all(candidates[:, active] >= least - atol, axis=1)
+      # rows that always hold are the same whatever their residual
+      expanded.append(np.minimum(candidates[feasible][:, active], most))
+      expanded_weights.append(np.repeat(weights[start:start + step], len(values))[feasible])
+    A, b = A[active], b[active]
+    residuals, weights = merge(np.concatenate(expanded), np.concatenate(expanded_weights))
+    if len(residuals) == 0:
+      return 0
+
+  total = 0
+  step = max(1, CHUNK_SIZE // max(1, len(b)))
+  for start in range(0, len(residuals), step):
+    counts = count_last(A[:, -1], residuals[start:start + step], lower[-1], upper[-1], atol)
+    total += int(np.dot(counts.astype(dtype), weights[start:start + step]))
+  return total
@@ -1,27 +1,168 @@
-
+import numpy as np
 
 from src.abstract_domains.abstract_domain import AbstractDomain
-from src.abstract_domains.poly import Poly, Status
+from src.abstract_domains.boxes import Box, hull, overlaps
+from src.abstract_domains.poly import Poly, Status, WITNESS_TOLERANCE, get_minimize_threshold
 from src.utils.progress_bar import progress_bar, subprogress_bar
 
 
+UNKNOWN, TOP, BOTTOM = 0, 1, 2
+STATUS_CODES = {Status.UNKNOWN: UNKNOWN, Status.TOP: TOP, Status.BOTTOM: BOTTOM}
+# rows times points compared at once by contains_points
+CHUNK_SIZE = 1 << 22
+
+def eliminate_stacked(index: int, A: np.ndarray, b: np.ndarray, owners: np.ndarray, atol: float = 1e-10) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """ Fourier-Motzkin elimination of the variable at index from several
+  systems stacked in A x <= b, row i belonging to the system owners[i].
+  Rows are grouped by owner, and so are the returned ones. """
+  column = A[:, index]
+  positive = np.flatnonzero(column >= atol)
+  negative = np.flatnonzero(column <= -atol)
+  core = np.flatnonzero(np.abs(column) < atol)
+  other = np.arange(A.shape[1]) != index
+
+  # each positive row pairs with the negative rows of the same owner
+  k = int(owners.max(initial=-1)) + 1
+  q = np.bincount(owners[negative], minlength=k)
+  negative_start = np.cumsum(q) - q
+  repeats = q[owners[positive]]
+  pair_positive = np.repeat(positive, repeats)
+  group_start = np.repeat(np.cumsum(repeats) - repeats, repeats)
+  pair_negative = negative[np.repeat(negative_start[owners[positive]], repeats) + np.arange(len(pair_positive)) - group_start]
+
+  # A_positive x_other + x_r <= b_positive, A_negative x_other + x_r >= b_negative
+  scaled = np.zeros((A.shape[0], A.shape[1] - 1))
+  scaled_b = np.zeros(A.shape[0])
+  bounded = np.concatenate((positive, negative))
+  scaled[bounded] = A[bounded][:, other] / column[bounded, None]
+  scaled_b[bounded] = b[bounded] / column[bounded]
+
+  A_new = np.concatenate((scaled[pair_positive] - scaled[pair_negative], A[core][:, other]))
+  b_new = np.concatenate((scaled_b[pair_positive] - scaled_b[pair_negative], b[core]))
+  owners_new = np.concatenate((owners[pair_positive], owners[core]))
+  order = np.argsort(owners_new, kind='stable')
+  return A_new[order], b_new[order], owners_new[order]
+
 class DisjunctivePoly(AbstractDomain):
+  """ Disjunction of polyhedra over the same variables.
+
+  The constraints of all the disjuncts are stacked in a single system
+  A x <= b, disjunct i owning the rows offsets[i]:offsets[i+1], and statuses
+  holds one status code per disjunct. The disjuncts are also available as
+  Poly views over their rows, built on first access.
+  """
   def __init__(self, polyhedra: list[Poly]):
-    self.polyhedra = polyhedra
+    variables = next((p.variables for p in polyhedra if len(p.variables) > 0), [])
+    assert(all(len(p.variables) == 0 or p.variables == variables for p in polyhedra))
+    n = len(variables)
+    stacked = [p.status == Status.UNKNOWN and n > 0 for p in polyhedra]
+    blocks = [p.A.reshape(-1, n) if s else np.empty((0, n)) for p, s in zip(polyhedra, stacked)]
+    self.variables = variables
+    self.A = np.vstack(blocks) if len(blocks) > 0 else np.empty((0, n))
+    self.b = np.concatenate([p.b.reshape(-1) if s else np.empty(0) for p, s in zip(polyhedra, stacked)] + [np.empty(0)])
+    self.offsets = np.cumsum([0] + [len(block) for block in blocks])
+    self.statuses = np.array([STATUS_CODES[p.status] for p in polyhedra], dtype=np.uint8)
     self.status = Status.UNKNOWN
+    self.views: list[Poly | None] = [self.view(i, p) for i, p in enumerate(polyhedra)]
+
+  @staticmethod
+  def from_arrays(variables: list[str], A: np.ndarray, b: np.ndarray, offsets: np.ndarray, statuses: np.ndarray) -> 'DisjunctivePoly':
+    this = DisjunctivePoly([])
+    this.variables = variables
+    this.A, this.b = A.reshape(-1, len(variables)), b.reshape(-1)
+    this.offsets = offsets
+    this.statuses = statuses.astype(np.uint8)
+    this.views = [None] * len(statuses)
+    return this
 
   @staticmethod
   def top() -> 'DisjunctivePoly':
     this = DisjunctivePoly([])
     this.status = Status.TOP
     return this
-    
+
   @staticmethod
   def bottom() -> 'DisjunctivePoly':
     this = DisjunctivePoly([])
     this.status = Status.BOTTOM
     return this
 
+  def __getstate__(self):
+    # views are slices of A and b, they would be pickled as copies
+    self.sync_statuses()
+    state = self.__dict__.copy()
+    state['views'] = [None] * len(self.statuses)
+    return state
+
+  def view(self, i: int, source: Poly | None = None) -> Poly:
+    """ Disjunct i as a Poly sharing the rows of A and b, carrying over
+    what source already knows about it (status, witnesses, boxes) """
+    if self.statuses[i] == TOP:
+      return Poly.top()
+    if self.statuses[i] == BOTTOM:
+      return Poly.bottom()
+    start, end = self.offsets[i], self.offsets[i + 1]
+    poly = Poly(self.variables, self.A[start:end], self.b[start:end])
+    if source is not None:
+      poly.status = source.status
+      poly.witnesses = list(source.witnesses)
+      poly.boxes = dict(source.boxes)
+    return poly
+
+  @property
+  def polyhedra(self) -> list[Poly]:
+    for i, view in enumerate(self.views):
+      if view is None:
+        self.views[i] = self.view(i)
+    return self.views # type: ignore
+
+  def sync_statuses(self) -> np.ndarray:
+    # views learn their status lazily, through LPs
+    for i, view in enumerate(self.views):
+      if view is not None:
+        self.statuses[i] = STATUS_CODES[view.status]
+    return self.statuses
+
+  def owners(self) -> np.ndarray:
+    return np.repeat(np.arange(len(self.statuses)), np.diff(self.offsets))
+
+  def filter(self, mask: np.ndarray) -> 'DisjunctivePoly':
+    """ Disjunction of the disjuncts selected by mask """
+    statuses = self.sync_statuses()
+    counts = np.diff(self.offsets)
+    rows = np.repeat(mask, counts)
+    this = DisjunctivePoly.from_arrays(
+      self.variables, self.A[rows], self.b[rows], np.concatenate(([0], np.cumsum(counts[mask]))), statuses[mask])
+    for j, i in enumerate(np.flatnonzero(mask)):
+      if self.views[i] is not None:
+        this.views[j] = this.view(j, self.views[i])
+    return this
+
+  def contains(self, x: np.ndarray) -> np.ndarray:
+    """ Mask of the disjuncts containing the point x """
+    statuses = self.sync_statuses()
+    satisfied = self.A @ x - self.b <= WITNESS_TOLERANCE * np.abs(self.A).max(axis=1, initial=0)
+    violated = np.bincount(self.owners()[~satisfied], minlength=len(statuses))
+    return (statuses == TOP) | ((statuses == UNKNOWN) & (violated == 0))
+
+  def contains_points(self, points: np.ndarray) -> np.ndarray:
+    """ Mask of the points, one per row, that are in some disjunct """
+    if self.status == Status.BOTTOM:
+      return np.zeros(len(points), dtype=bool)
+    if self.is_top():
+      return np.ones(len(points), dtype=bool)
+    statuses = self.sync_statuses()
+    tolerance = WITNESS_TOLERANCE * np.abs(self.A).max(axis=1, initial=0)
+    inside = np.zeros(len(points), dtype=bool)
+    step = max(1, CHUNK_SIZE // max(1, len(self.b)))
+    for start in range(0, len(points), step):
+      violated = self.A @ points[start:start + step].T - self.b[:, None] > tolerance[:, None]
+      # violations of each disjunct, from the running sum over its rows
+      running = np.vstack((np.zeros((1, violated.shape[1]), dtype=int), np.cumsum(violated, axis=0)))
+      violations = running[self.offsets[1:]] - running[self.offsets[:-1]]
+      inside[start:start + step] = np.any((violations == 0) & (statuses == UNKNOWN)[:, None], axis=0)
+    return inside
+
   def intersect(self, other: 'DisjunctivePoly') -> 'DisjunctivePoly':
     if self.is_bottom() or other.is_bottom():
       return DisjunctivePoly.bottom()
@@ -31,30 +172,71 @@ class DisjunctivePoly(AbstractDomain):
       return self
     polys = []
     for p1 in subprogress_bar(self.polyhedra):
+      session = p1.session() if p1.status == Status.UNKNOWN else None
       for p2 in subprogress_bar(other.polyhedra):
-        intersection = p1.intersect(p2)
-        if not intersection.is_bottom():
+        if not overlaps(p1.bounding_box(), p2.bounding_box()):
+          continue
+        if p1.does_intersect(p2, session):
           polys.append(p1.intersect(p2))
     return DisjunctivePoly(polys)
-  
+
+  def bounding_box(self, lp: bool = False) -> Box | None:
+    if self.status != Status.UNKNOWN:
+      return None
+    return hull([p.bounding_box(lp) for p in self.polyhedra if p.status != Status.BOTTOM])
+
   def remove_bottoms(self) -> 'DisjunctivePoly':
-    return DisjunctivePoly([p for p in self.polyhedra if not p.is_bottom()])
-  
-  def eliminate(self, variable: str) -> 'DisjunctivePoly':
-    if self.is_bottom() or self.is_top():
+    this = self.filter(self.sync_statuses() != BOTTOM)
+    return this.filter(np.array([not p.is_bottom() for p in this.polyhedra], dtype=bool))
+
+  def eliminate(self, variable: str | list[str]) -> 'DisjunctivePoly':
+    # a top disjunct stays top, the others still need projecting
+    if self.is_bottom() or self.status == Status.TOP:
       return self
-    polyhedra = [p.eliminate(variable) for p in self.polyhedra]
-    return DisjunctivePoly(polyhedra)
-  
+    eliminated = [variable] if isinstance(variable, str) else variable
+    for v in eliminated:
+      if v not in self.variables:
+        raise Exception(f'Variable {v} not found in {self.variables}')
+    statuses = self.sync_statuses()
+    A, b, owners = self.A, self.b, self.owners()
+    variables = list(self.variables)
+    remaining = list(eliminated)
+    while len(remaining) > 0:
+      # as in eliminate_many, first the variable producing the fewest rows
+      growth = []
+      for v in remaining:
+        column = A[:, variables.index(v)]
+        p = np.bincount(owners[column >= 1e-10], minlength=len(statuses))
+        q = np.bincount(owners[column <= -1e-10], minlength=len(statuses))
+        growth.append(np.sum(p * q - p - q))
+      v = remaining.pop(int(np.argmin(growth)))
+      A, b, owners = eliminate_stacked(variables.index(v), A, b, owners)
+      variables.remove(v)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(owners, minlength=len(statuses)))))
+    this = DisjunctivePoly.from_arrays(variables, A, b, offsets, statuses.copy())
+
+    # the projection of a point of a disjunct is a point of its projection
+    kept = [i for i, v in enumerate(self.variables) if v not in eliminated]
+    for i, view in enumerate(self.views):
+      if view is not None and statuses[i] == UNKNOWN and len(view.witnesses) > 0:
+        projected = this.view(i)
+        projected.add_witnesses([x[kept] for x in view.witnesses])
+        this.views[i] = projected
+
+    threshold = get_minimize_threshold()
+    if threshold is not None and np.any(np.diff(offsets) > threshold):
+      return DisjunctivePoly([p.minimize_above_threshold() for p in this.polyhedra])
+    return this
+
   def is_top(self) -> bool:
     if self.status == Status.TOP:
       return True
     if self.status == Status.BOTTOM:
       return False
-    if any([p.is_top() for p in self.polyhedra]):
+    if np.any(self.sync_statuses() == TOP):
       return True
     return False
-  
+
   def is_bottom(self) -> bool:
     if self.status == Status.BOTTOM:
       return True
@@ -62,13 +244,13 @@ class DisjunctivePoly(AbstractDomain):
       return False
     if any([not p.is_bottom() for p in self.polyhedra]):
       return False
+    self.status = Status.BOTTOM
     return True
-  
+
   def __str__(self) -> str:
     if self.is_bottom():
       return "bottom"
     if self.is_top():
       return "top"
-    return f"DisjunctivePoly({len(self.polyhedra)} polyhedra)"
+    return f"DisjunctivePoly({len(self.statuses)} polyhedra)"
     return "\n\n=== or ===\n\n".join([str(p) for p in self.polyhedra])
-  
\ No newline at end of file
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from hashlib import blake2b
+
+import numpy as np
+
+
+DEFAULT_FEASIBILITY_CACHE_SIZE = 1 << 16
+
+def canonical_key(A: np.ndarray, b: np.ndarray) -> bytes:
+  """ Same key for the same system up to the order and repetition of its rows """
+  n = A.shape[1] if A.ndim == 2 else 0
+  rows = np.unique(np.hstack((A.reshape(-1, n), b.reshape(-1, 1))), axis=0)
+  rows = rows + 0. # -0. and 0. hash alike
+  h = blake2b(digest_size=16)
+  h.update(n.to_bytes(4, 'little'))
+  h.update(np.ascontiguousarray(rows, dtype='<f8').tobytes())
+  return h.digest()
+
+class FeasibilityCache:
+  """ Process-wide memory of the feasibility checks, shared by every Poly.
+
+  Entries map the canonical key of a system to whether it is feasible and,
+  if so, a point satisfying it. The least recently used entries are evicted
+  above max_entries.
+  """
+  def __init__(self, max_entries: int = DEFAULT_FEASIBILITY_CACHE_SIZE):
+    self.max_entries = max_entries
+    self.entries: OrderedDict[bytes, tuple[bool, np.ndarray | None]] = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def load(self, key: bytes) -> tuple[bool, np.ndarray | None] | None:
+    entry = self.entries.get(key)
+    if entry is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.entries.move_to_end(key)
+    return entry
+
+  def store(self, key: bytes, feasible: bool, witness: np.ndarray | None) -> None:
+    self.entries[key] = (feasible, witness)
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.max_entries:
+      self.entries.popitem(last=False)
+
+  def __str__(self):
+    total = self.hits + self.misses
+    rate = self.hits / total * 100 if total > 0 else 0
+    return f'{self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {len(self.entries)} entries'
+
+FEASIBILITY_CACHE: FeasibilityCache | None = FeasibilityCache()
+
+def set_feasibility_cache(cache: FeasibilityCache | None) -> None:
+  global FEASIBILITY_CACHE
+  FEASIBILITY_CACHE = cache
+
+def get_feasibility_cache() -> FeasibilityCache | None:
+  return FEASIBILITY_CACHE
+
+def get_feasibility_stats() -> tuple[int, int]:
+  """ Hits and misses of the feasibility cache """
+  if FEASIBILITY_CACHE is None:
+    return 0, 0
+  return FEASIBILITY_CACHE.hits, FEASIBILITY_CACHE.misses
+
+def reset_feasibility_stats() -> None:
+  if FEASIBILITY_CACHE is not None:
+    FEASIBILITY_CACHE.hits, FEASIBILITY_CACHE.misses = 0, 0
+
+def merge_feasibility_stats(stats: tuple[int, int]) -> None:
+  if FEASIBILITY_CACHE is not None:
+    FEASIBILITY_CACHE.hits += stats[0]
+    FEASIBILITY_CACHE.misses += stats[1]
@@ -0,0 +1,139 @@
+""" Binary interchange format for preconditions.
+
+A record is laid out as follows (little endian):
+
+  magic   4 bytes  b'IMPP'
+  version u8
+  kind    u8       0 = Poly, 1 = DisjunctivePoly
+  status  u8       0 = unknown, 1 = top, 2 = bottom
+  nvars   u16      followed by nvars names, each as u16 length + utf-8 bytes
+  blocks           each block is a polyhedron:
+                     status u8 (0xFF ends the record)
+                     rows   u32
+                     A      rows * nvars float64, row major
+                     b      rows float64
+
+Variables are written with their original names, so a record can be produced
+by an external engine and read back by any impatto process. A Poly record
+holds exactly one block, a DisjunctivePoly record holds one block for each
+disjunct.
+"""
+from pathlib import Path
+import struct
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.disjunctive_poly import DisjunctivePoly
+from src.abstract_domains.poly import Poly, Status
+from src.utils.string import from_harmonic_to_variable, from_variable_to_harmonic
+
+
+MAGIC = b'IMPP'
+VERSION = 1
+POLY, DISJUNCTIVE_POLY = 0, 1
+END = 0xFF
+STATUS_CODES = {Status.UNKNOWN: 0, Status.TOP: 1, Status.BOTTOM: 2}
+CODE_STATUSES = {v: k for k, v in STATUS_CODES.items()}
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+  data = f.read(size)
+  if len(data) != size:
+    raise Exception(f'Truncated precondition stream, expected {size} bytes, got {len(data)}')
+  return data
+
+def _read(f: BinaryIO, fmt: str) -> tuple:
+  return struct.unpack(fmt, _read_exact(f, struct.calcsize(fmt)))
+
+def write_block(f: BinaryIO, poly: Poly, nvars: int) -> None:
+  f.write(struct.pack('<B', STATUS_CODES[poly.status]))
+  if poly.status != Status.UNKNOWN:
+    f.write(struct.pack('<I', 0))
+    return
+  A = np.ascontiguousarray(poly.A, dtype='<f8').reshape(-1, nvars)
+  b = np.ascontiguousarray(poly.b, dtype='<f8').reshape(-1)
+  f.write(struct.pack('<I', A.shape[0]))
+  f.write(A.tobytes())
+  f.write(b.tobytes())
+
+def write_precondition(f: BinaryIO, precondition: AbstractDomain) -> None:
+  if isinstance(precondition, Poly):
+    kind, polyhedra = POLY, [precondition]
+  elif isinstance(precondition, DisjunctivePoly):
+    kind, polyhedra = DISJUNCTIVE_POLY, precondition.polyhedra
+  else:
+    raise Exception(f'Cannot serialize precondition of type {type(precondition).__name__}')
+
+  # bottom and top polyhedra carry no variables
+  variables = next((p.variables for p in polyhedra if len(p.variables) > 0), [])
+  assert(all(len(p.variables) == 0 or p.variables == variables for p in polyhedra))
+  names = [from_harmonic_to_variable(v).encode('utf-8') for v in variables]
+
+  f.write(MAGIC)
+  f.write(struct.pack('<BBBH', VERSION, kind, STATUS_CODES[precondition.status], len(names)))
+  for name in names:
+    f.write(struct.pack('<H', len(name)))
+    f.write(name)
+  for poly in polyhedra:
+    write_block(f, poly, len(names))
+  f.write(struct.pack('<B', END))
+
+def read_header(f: BinaryIO) -> tuple[int, Status, list[str]] | None:
+  magic = f.read(len(MAGIC))
+  if len(magic) == 0:
+    return None
+  if magic != MAGIC:
+    raise Exception(f'Not a precondition stream (magic {magic!r})')
+  version, kind, status, nvars = _read(f, '<BBBH')
+  if version != VERSION:
+    raise Exception(f'Unsupported precondition stream version {version}')
+  names = []
+  for _ in range(nvars):
+    length, = _read(f, '<H')
+    names.append(_read_exact(f, length).decode('utf-8'))
+  variables = [from_variable_to_harmonic(name) for name in names]
+  return kind, CODE_STATUSES[status], variables
+
+def iter_polyhedra(f: BinaryIO, variables: list[str]) -> Iterator[Poly]:
+  """ Yield the blocks of the current record one at a time """
+  nvars = len(variables)
+  while True:
+    status, = _read(f, '<B')
+    if status == END:
+      return
+    rows, = _read(f, '<I')
+    if CODE_STATUSES[status] == Status.BOTTOM:
+      yield Poly.bottom()
+    elif CODE_STATUSES[status] == Status.TOP:
+      yield Poly.top()
+    else:
+      A = np.frombuffer(_read_exact(f, 8 * rows * nvars), dtype='<f8').reshape(rows, nvars).copy()
+      b = np.frombuffer(_read_exact(f, 8 * rows), dtype='<f8').copy()
+      yield Poly(variables, A, b)
+
+def read_precondition(f: BinaryIO) -> AbstractDomain | None:
+  header = read_header(f)
+  if header is None:
+    return None
+  kind, status, variables = header
+  polyhedra = list(iter_polyhedra(f, variables))
+  if kind == POLY:
+    assert(len(polyhedra) == 1)
+    return polyhedra[0]
+  precondition = DisjunctivePoly(polyhedra)
+  precondition.status = status
+  return precondition
+
+def dump_preconditions(path: Path, preconditions: list[AbstractDomain]) -> None:
+  with open(path, 'wb') as f:
+    for precondition in preconditions:
+      write_precondition(f, precondition)
+
+def load_preconditions(path: Path) -> list[AbstractDomain]:
+  acc = []
+  with open(path, 'rb') as f:
+    while (precondition := read_precondition(f)) is not None:
+      acc.append(precondition)
+  return acc
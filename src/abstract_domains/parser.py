@@ -0,0 +1,140 @@
+""" Parser for the linear constraints printed by the backward engines.
+
+Examples of accepted constraints:
+  -930257069563x+4349059158133y+17674884321697>=0   (interproc)
+  x=0
+  -0.2356x -0.3880y 0.0z <= 0.6527                   (disjunctive completion)
+  3/2*HW1 + avg < 10
+  x + -y >= -2
+"""
+from functools import lru_cache
+import re
+
+import numpy as np
+
+
+eps = 1e-5
+
+NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+IDENTIFIER = r'[A-Za-z_][A-Za-z0-9_]*'
+TERM = re.compile(
+  r'\s*(?P<sign>[+-])?\s*(?P<unary>[+-])?\s*'
+  rf'(?P<coefficient>{NUMBER}(?:\s*/\s*{NUMBER})?)?\s*\*?\s*'
+  rf'(?P<variable>{IDENTIFIER})?\s*')
+OPERATOR = re.compile(r'<=|>=|==|=<|=>|<|>|=')
+OPERATORS = {'=<': '<=', '=>': '>=', '=': '=='}
+
+
+def parse_coefficient(text: str | None) -> float:
+  if not text:
+    return 1.0
+  if '/' in text:
+    numerator, denominator = text.split('/')
+    return float(numerator) / float(denominator)
+  return float(text)
+
+def parse_linear_expression(columns: dict[str, int], expression: str, row: np.ndarray) -> float:
+  """ Accumulate the coefficients of expression into row, return its constant """
+  constant, position = 0.0, 0
+  while position < len(expression):
+    match = TERM.match(expression, position)
+    assert(match is not None) # every group is optional
+    if match.end() == position or (match['coefficient'] is None and match['variable'] is None):
+      raise Exception(f'Unexpected "{expression[position:]}"')
+    # terms apart with no sign in between add up, as the network engines print them
+    if position > 0 and match['sign'] is None and not expression[position - 1].isspace():
+      raise Exception(f'Missing operator before "{match.group().strip()}"')
+    coefficient = parse_coefficient(match['coefficient'])
+    if (match['sign'] == '-') != (match['unary'] == '-'):
+      coefficient = -coefficient
+    if match['variable'] is None:
+      constant += coefficient
+    elif match['variable'] in columns:
+      row[columns[match['variable']]] += coefficient
+    else:
+      raise Exception(f'Unknown variable "{match["variable"]}"')
+    position = match.end()
+  return constant
+
+def parse_linear_constraint(columns: dict[str, int], n: int, constraint: str) -> tuple[str, np.ndarray, float]:
+  """ Return op, a, c such that the constraint reads a * x op c """
+  operators = list(OPERATOR.finditer(constraint))
+  if len(operators) != 1:
+    raise Exception(f'Expected exactly one comparison, found {len(operators)}')
+  operator = operators[0]
+  lhs, rhs = constraint[:operator.start()], constraint[operator.end():]
+  a_lhs, a_rhs = np.zeros(n), np.zeros(n)
+  c_lhs = parse_linear_expression(columns, lhs, a_lhs)
+  c_rhs = parse_linear_expression(columns, rhs, a_rhs)
+  op = OPERATORS.get(operator.group(), operator.group())
+  return op, a_lhs - a_rhs, c_rhs - c_lhs
+
+@lru_cache(maxsize=32)
+def aligned_row_pattern(variables: tuple[str, ...]) -> re.Pattern:
+  # c1 v1 c2 v2 ... cn vn <= d, with the variables in the given order
+  coefficients = r'[ \t]*'.join(rf'([+-]?{NUMBER})[ \t]*\*?[ \t]*{re.escape(v)}\b' for v in variables)
+  return re.compile(rf'^[ \t]*{coefficients}[ \t]*<=[ \t]*([+-]?{NUMBER})[ \t]*$', re.MULTILINE)
+
+def parse_aligned_constraints(variables: tuple[str, ...], constraints: list[str]) -> tuple[np.ndarray, np.ndarray] | None:
+  """ Vectorised path for blocks where every row lists all the variables in
+  order followed by '<= d', as the network engines print them. """
+  if len(variables) == 0:
+    return None
+  rows = aligned_row_pattern(variables).findall('\n'.join(constraints))
+  if len(rows) != len(constraints):
+    return None
+  values = np.array(rows, dtype=float).reshape(len(constraints), len(variables) + 1)
+  return values[:, :-1], values[:, -1]
+
+def parse_linear_constraints(variables: list[str], constraints: list[str], aliases: dict[str, str] = {}) -> tuple[np.ndarray, np.ndarray]:
+  """ Parse the constraints into A x <= b, the columns of A follow variables.
+
+  Identifiers in the constraints are either variables or keys of aliases,
+  which map alternative names to variables.
+  """
+  names = {variable: alias for alias, variable in aliases.items()}
+  for order in [tuple(variables), tuple(names.get(v, v) for v in variables)]:
+    aligned = parse_aligned_constraints(order, constraints)
+    if aligned is not None:
+      return aligned
+
+  columns = {v: i for i, v in enumerate(variables)}
+  for alias, variable in aliases.items():
+    columns.setdefault(alias, columns[variable])
+
+  A, b = [], []
+  for constraint in constraints:
+    try:
+      operator, a, c = parse_linear_constraint(columns, len(variables), constraint)
+    except Exception as e:
+      raise Exception(f'Error {e} while parsing constraint:\n{constraint}\nOver constraints:\n{constraints}')
+
+    if not a.any() and (
+        (operator == '<=' and 0 <= c) or
+        (operator == '==' and 0 == c) or
+        (operator == '>=' and 0 >= c) or
+        (operator == '<' and 0 < c) or
+        (operator == '>' and 0 > c)):
+      continue # trivially true, e.g. 0 <= 1
+
+    if operator == "<=":
+      A.append(a)
+      b.append(c)
+    elif operator == ">=":
+      A.append(-a)
+      b.append(-c)
+    elif operator == "==":
+      A.append(a)
+      b.append(c)
+      A.append(-a)
+      b.append(-c)
+    elif operator == "<":
+      A.append(a)
+      b.append(c - eps)
+    elif operator == ">":
+      A.append(-a)
+      b.append(-c - eps)
+    else:
+      raise Exception(f'Unknown operator {operator}')
+
+  return np.array(A).reshape(-1, len(variables)), np.array(b, dtype=float)
@@ -1,17 +1,22 @@
 from logging import debug, warning
 import numpy as np
 import re
-import sympy as sp
 from enum import Enum
-from itertools import product
-import networkx as nx
+from itertools import tee
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-from src.utils.lp import SolverError, solve
+from src.utils.lp import Session, SolverError, solve
+from src.utils.parallel import get_workers, imap_chunks
 from src.utils.progress_bar import subprogress_bar
 from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.boxes import Box, overlapping_pairs, variable_bounds
+from src.abstract_domains.counting import count_integer_points
+from src.abstract_domains.feasibility import canonical_key, get_feasibility_cache
+from src.abstract_domains.parser import parse_linear_constraints
 from src.utils.string import from_harmonic_to_variable
 
-eps = 1e-5
+if TYPE_CHECKING:
+  import sympy as sp
 
 
 class Status(Enum):
@@ -19,82 +24,150 @@ class Status(Enum):
   BOTTOM = 'bottom'
   UNKNOWN = 'unknown'
 
+# eliminate and intersect minimize their results above this many rows, None never
+MINIMIZE_THRESHOLD: int | None = 64
+# whether that minimization also removes the rows implied by the others, with LPs
+MINIMIZE_LP = False
+# the box the LP solvers search in, see src.utils.lp
+LP_BOUND = 100000
+# feasible points kept by each Poly, and how far outside a (normalized) row they may be
+MAX_WITNESSES = 4
+WITNESS_TOLERANCE = 1e-7
+
+def set_minimize_threshold(rows: int | None) -> None:
+  global MINIMIZE_THRESHOLD
+  MINIMIZE_THRESHOLD = rows
+
+def get_minimize_threshold() -> int | None:
+  return MINIMIZE_THRESHOLD
+
+def set_minimize_lp(lp: bool) -> None:
+  global MINIMIZE_LP
+  MINIMIZE_LP = lp
+
+def get_minimize_lp() -> bool:
+  return MINIMIZE_LP
+
 def eliminate_single(index: int, A: np.ndarray, b: np.ndarray, atol: float = 1e-10) -> tuple[np.ndarray, np.ndarray]:
+  """ Fourier-Motzkin elimination of the variable at index from A x <= b """
   assert(index < A.shape[1])
   assert(A.shape[0] == b.shape[0])
+  b = b.reshape(-1)
+  column = A[:, index]
+  positive = column >= atol
+  negative = column <= -atol
+  core = ~(positive | negative)
+  other = np.arange(A.shape[1]) != index
+  n = A.shape[1] - 1
+
+  # scale the rows so that the eliminated variable has coefficient 1 or -1
+  # A_positive x_other + x_r <= b_positive
+  # A_negative x_other + x_r >= b_negative
+  A_positive = A[positive][:, other] / column[positive, None]
+  b_positive = b[positive] / column[positive]
+  A_negative = A[negative][:, other] / column[negative, None]
+  b_negative = b[negative] / column[negative]
+  p, q, r = len(b_positive), len(b_negative), int(core.sum())
+
+  # (A_positive - A_negative) x_other <= b_positive - b_negative, for all the pairs
+  A_new = np.empty((p * q + r, n))
+  b_new = np.empty(p * q + r)
+  np.subtract(A_positive[:, None, :], A_negative[None, :, :], out=A_new[:p * q].reshape(p, q, n))
+  np.subtract(b_positive[:, None], b_negative[None, :], out=b_new[:p * q].reshape(p, q))
+  A_new[p * q:] = A[core][:, other]
+  b_new[p * q:] = b[core]
+  return A_new, b_new
 
-  phi_positive=[i for i in range(A.shape[0]) if A[i,index]>=atol] # list of positive var entries
-  phi_negative=[i for i in range(A.shape[0]) if A[i,index]<=-atol]  # list of negative var entries
-  phi_core=[i for i in range(A.shape[0]) if abs(A[i,index])<atol]  # list of zero var entries
-  s_smaller=np.diag(1/A[phi_positive,index]) # positive
-  s_larger=np.diag(1/A[phi_negative,index]) # negative
-  A_positive=np.dot(s_smaller,A[phi_positive,:]) # A of postives scaled by var entries
-  b_positive=np.dot(s_smaller,b[phi_positive,:])
-  A_negative=np.dot(s_larger,A[phi_negative,:])
-  b_negative=np.dot(s_larger,b[phi_negative,:]) 
-  """ We have A_positive x_other + x_r <= b_positive
-  --> We have A_negative x_other + x_r >= b_negative
-  --> We have b_postive - b_negative >= (A_neg - A _pos) * x_other (all combinations)
+def eliminate_many(indices: list[int], A: np.ndarray, b: np.ndarray, atol: float = 1e-10, threshold: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+  """ Eliminate all the variables at indices, each time picking the one
+  that produces the fewest rows. Intermediate systems above threshold rows
+  are minimized (syntactically) before the next elimination. """
+  remaining = sorted(set(indices))
+  while len(remaining) > 0:
+    growth = [
+      np.sum(A[:, i] >= atol) * np.sum(A[:, i] <= -atol) - np.sum(np.abs(A[:, i]) >= atol)
+      for i in remaining]
+    index = remaining.pop(int(np.argmin(growth)))
+    A, b = eliminate_single(index, A, b, atol)
+    remaining = [i - 1 if i > index else i for i in remaining]
+    if threshold is not None and len(b) > threshold:
+      minimized = minimize_constraints(A, b)
+      if minimized is None:
+        # infeasible, keep a single row that says so
+        return np.zeros((1, A.shape[1])), np.array([-1.])
+      A, b = minimized
+  return A, b
+
+def normalize_constraints(A: np.ndarray, b: np.ndarray, atol: float = 1e-10) -> tuple[np.ndarray, np.ndarray] | None:
+  """ Scale every row of A x <= b to a canonical form, drop the rows that
+  always hold and keep only the tightest of the rows parallel to each other.
+
+  Integer rows are divided by the gcd of their coefficients, the others by
+  their largest coefficient. Return None if some row never holds.
   """
-  A_new=np.empty((0,A.shape[1]-1))
-  b_new=np.empty((0,1))
-  other=list(range(0,index))+list(range(index+1,A.shape[1]))
-  for i in range(len(phi_positive)):
-    for j in range(len(phi_negative)):
-      alpha=(-A_negative[j,other]+A_positive[i,other]).reshape(1,len(other))
-      beta=b_positive[i,:]-b_negative[j,:]
-      A_new=np.vstack((A_new,alpha))
-      b_new=np.vstack((b_new,beta))
-  if phi_core!=[]:
-    A_new=np.vstack((A_new,A[phi_core,:][:,other]))
-    b_new=np.vstack((b_new,b[phi_core,:]))
-  return A_new,b_new
-
-def parse_polyhedra_constraints(variables: list[str], constraints: list[str]) -> tuple[list[str], np.ndarray, np.ndarray]:
-  A = []  # Coefficient matrix
-  b = []  # Right-hand side vector
-
-  sym_variables = sp.symbols(variables)
-  
-  for constraint in constraints:
+  norm = np.abs(A).max(axis=1) if A.shape[1] > 0 else np.zeros(len(b))
+  zero = norm < atol
+  if np.any(b[zero] < -atol):
+    return None
+  A, b, norm = A[~zero], b[~zero], norm[~zero]
+
+  # parallel rows share the same key, the first in order of bound is the tightest
+  key_A, key_b = A / norm[:, None], b / norm
+  order = np.argsort(key_b, kind='stable')
+  _, first = np.unique(np.round(key_A[order], 9), axis=0, return_index=True)
+  keep = np.sort(order[first])
+  A, b, scale = A[keep], b[keep], norm[keep]
+
+  integral = (A == np.rint(A)).all(axis=1) & (b == np.rint(b)) & (np.abs(A) < 2**53).all(axis=1)
+  scale[integral] = np.gcd.reduce(np.abs(np.rint(A[integral])).astype(np.int64), axis=1)
+  return A / scale[:, None], b / scale
+
+def remove_bounded_constraints(A: np.ndarray, b: np.ndarray, atol: float = 1e-10) -> tuple[np.ndarray, np.ndarray] | None:
+  """ Drop the rows implied by the variable bounds (rows over a single
+  variable) of the same system, by interval arithmetic. Return None if the
+  bounds are contradictory. """
+  single = (np.abs(A) >= atol).sum(axis=1) == 1
+  lower, upper = variable_bounds(A, b, atol)
+  if np.any(lower > upper + atol):
+    return None
+
+  with np.errstate(invalid='ignore'):
+    highest = np.where(A > 0, A * upper, 0) + np.where(A < 0, A * lower, 0)
+  redundant = ~single & (highest.sum(axis=1) <= b + atol)
+  return A[~redundant], b[~redundant]
+
+def remove_lp_redundant_constraints(A: np.ndarray, b: np.ndarray, atol: float = 1e-7) -> tuple[np.ndarray, np.ndarray] | None:
+  """ Drop, one at a time, the rows that the remaining ones imply: row i is
+  redundant when maximizing A[i] x over the others stays below b[i].
+  Return None if the system is infeasible. """
+  keep = np.ones(len(b), dtype=bool)
+  for i in range(len(b)):
+    keep[i] = False
+    if not keep.any():
+      keep[i] = True
+      continue
     try:
-      parsed_constraint = sp.parse_expr(constraint, transformations='all')
-      if parsed_constraint == True:
-        continue
-      operator = parsed_constraint.rel_op
-      normalized_constraint = sp.simplify(parsed_constraint.lhs - parsed_constraint.rhs)
-      coefficients_dict = normalized_constraint.as_coefficients_dict()
-      coefficients = np.array([coefficients_dict[variable] for variable in sym_variables])
-      free_coeff = -(coefficients_dict[1])
-    except Exception as e:
-      raise Exception(f'Error {e} while parsing constraint:\n{constraint}\nOver constraints:\n{constraints}')
-    
-    if operator == "<=":
-      A.append(coefficients)
-      b.append(free_coeff)
-    elif operator == ">=":
-      A.append(-coefficients)
-      b.append(-free_coeff)
-    elif operator == "==":
-      A.append(coefficients)
-      b.append(free_coeff)
-      A.append(-coefficients)
-      b.append(-free_coeff)
-    elif operator == "<":
-      A.append(coefficients)
-      b.append(free_coeff - eps)
-    elif operator == ">":
-      A.append(-coefficients)
-      b.append(-free_coeff - eps)
-
-    elif operator == "<" or operator == ">":
-      raise Exception(f'Operator {operator} not supported at the moment')
-    else:
-      raise Exception(f'Unknown operator {operator}')
+      success, x = solve(-A[i], A[keep], b[keep])
+    except SolverError:
+      keep[i] = True
+      continue
+    if not success:
+      return None
+    # optima on the solver box are artifacts of the box, not of the system
+    if np.any(np.abs(x) >= LP_BOUND - 1) or A[i] @ x > b[i] + atol:
+      keep[i] = True
+  return A[keep], b[keep]
 
-  A = np.array(A)
-  b = np.array(b)
-  return variables, A, b
+def minimize_constraints(A: np.ndarray, b: np.ndarray, lp: bool = False) -> tuple[np.ndarray, np.ndarray] | None:
+  """ Normalize A x <= b and remove its redundant rows, with the linear
+  programs only if lp. Return None if the system is found infeasible. """
+  b = b.reshape(-1)
+  reduced = normalize_constraints(A, b)
+  if reduced is not None:
+    reduced = remove_bounded_constraints(*reduced)
+  if reduced is not None and lp:
+    reduced = remove_lp_redundant_constraints(*reduced)
+  return reduced
 
 class Poly(AbstractDomain):
 
@@ -103,20 +176,19 @@ class Poly(AbstractDomain):
     self.A = A
     self.b = b
     self.status = Status.UNKNOWN
+    self.boxes: dict[bool, Box | None] = {}
+    # points known to satisfy the constraints, they settle feasibility without LPs
+    self.witnesses: list[np.ndarray] = []
 
   @staticmethod
   def from_string_constraints(variables: list[str], variable_mapping, string_constraints: list[str]) -> 'Poly':
     if string_constraints == []:
       warning("Empty list of constraints, returning bottom")
       return Poly.bottom()
-    replaced_string_constriaints, replaced_variables = [], set()
-    for constraint in string_constraints:
-      for variable in variables:
-        replaced_variable = variable_mapping(variable)
-        constraint = constraint.replace(variable, replaced_variable)
-        replaced_variables.add(replaced_variable)
-      replaced_string_constriaints.append(constraint)
-    return Poly(*parse_polyhedra_constraints(list(replaced_variables), replaced_string_constriaints))
+    # constraints may use either the original names or the harmonic ones
+    harmonic = [variable_mapping(variable) for variable in variables]
+    A, b = parse_linear_constraints(variables, string_constraints, aliases=dict(zip(harmonic, variables)))
+    return Poly(harmonic, A, b)
 
   @staticmethod
   def top() -> 'Poly':
@@ -130,40 +202,194 @@ class Poly(AbstractDomain):
     poly.status = Status.BOTTOM
     return poly
 
-  def eliminate(self, variable: str) -> 'Poly':
+  def eliminate(self, variable: str | list[str]) -> 'Poly':
     if self.is_bottom() or self.is_top():
       return self
-    index = self.variables.index(variable)
-    if index == -1:
-      raise Exception(f'Variable {variable} not found in {self.variables}')
-    A, b = eliminate_single(index, self.A, self.b.reshape(-1, 1))
-    variables = self.variables[:index] + self.variables[index+1:]
-    return Poly(variables, A, b)
+    eliminated = [variable] if isinstance(variable, str) else variable
+    for v in eliminated:
+      if v not in self.variables:
+        raise Exception(f'Variable {v} not found in {self.variables}')
+    indices = [self.variables.index(v) for v in eliminated]
+    A, b = eliminate_many(indices, self.A, self.b, threshold=get_minimize_threshold())
+    variables = [v for v in self.variables if v not in eliminated]
+    projected = Poly(variables, A, b)
+    # the projection of a point of the poly is a point of the projection
+    kept = [i for i, v in enumerate(self.variables) if v not in eliminated]
+    projected.add_witnesses([x[kept] for x in self.witnesses])
+    return projected.minimize_above_threshold()
 
   def intersect(self, other: 'Poly') -> 'Poly':
     if self.is_bottom() or other.is_bottom():
       return Poly.bottom()
     assert(self.variables == other.variables)
     A = np.vstack((self.A, other.A))
-    b = np.vstack((self.b, other.b))
-    return Poly(self.variables, A, b)
+    b = np.concatenate((self.b.reshape(-1), other.b.reshape(-1)))
+    intersection = Poly(self.variables, A, b)
+    intersection.add_witnesses([x for x in self.witnesses if other.contains(x)])
+    intersection.add_witnesses([x for x in other.witnesses if self.contains(x)])
+    return intersection.minimize_above_threshold()
+
+  def does_intersect(self, other: AbstractDomain, session: Session | None = None) -> bool:
+    """ Whether the two intersect, with the LPs on session (from
+    self.session()) if given """
+    if not isinstance(other, Poly) or self.status != Status.UNKNOWN or other.status != Status.UNKNOWN:
+      return super().does_intersect(other)
+    if any(other.contains(x) for x in self.witnesses) or any(self.contains(x) for x in other.witnesses):
+      return True
+    if session is None:
+      intersection = self.intersect(other)
+      if intersection.is_bottom():
+        return False
+      points = intersection.witnesses
+    else:
+      feasible, center = self.intersection_center(other, session)
+      if not feasible:
+        return False
+      points = [] if center is None else [center]
+    # a point of the intersection is a point of both
+    self.add_witnesses(points)
+    other.add_witnesses(points)
+    return True
+
+  def session(self) -> Session:
+    """ Solver session holding the rows of the Chebyshev LP of this poly,
+    see intersection_center """
+    n = len(self.variables)
+    A, b = self.ball_rows()
+    return Session(np.vstack((A, np.append(np.zeros(n), -1))), np.append(b, 0))
+
+  def ball_rows(self) -> tuple[np.ndarray, np.ndarray]:
+    # A x + r ||A_i|| <= b
+    A = self.A.reshape(-1, len(self.variables))
+    return np.hstack((A, np.linalg.norm(A, axis=1).reshape(-1, 1))), self.b.reshape(-1)
+
+  def intersection_center(self, other: 'Poly', session: Session) -> tuple[bool, np.ndarray | None]:
+    """ Whether self and other intersect, and if so the Chebyshev centre of
+    their intersection (None if unknown) """
+    n = len(self.variables)
+    cache = get_feasibility_cache()
+    key = canonical_key(np.vstack((self.A, other.A)), np.concatenate((self.b.reshape(-1), other.b.reshape(-1)))) if cache else None
+    entry = cache.load(key) if cache and key else None
+    if entry is not None:
+      return entry
+    try:
+      with session.pushed(*other.ball_rows()):
+        feasible, x = session.solve(np.append(np.zeros(n), -1))
+    except SolverError:
+      return True, None
+    center = x[:n] if feasible else None
+    if cache and key:
+      cache.store(key, feasible, center)
+    return feasible, center
+
+  def contains(self, x: np.ndarray) -> bool:
+    if self.status != Status.UNKNOWN:
+      return self.status == Status.TOP
+    A = self.A.reshape(-1, len(self.variables))
+    # tolerance relative to each row, so that it does not depend on its scale
+    return bool(np.all(A @ x - self.b.reshape(-1) <= WITNESS_TOLERANCE * np.abs(A).max(axis=1, initial=0)))
+
+  def contains_points(self, points: np.ndarray) -> np.ndarray:
+    """ Mask of the points, one per row, that are in the poly """
+    if self.status != Status.UNKNOWN:
+      return np.full(len(points), self.status == Status.TOP)
+    A = self.A.reshape(-1, len(self.variables))
+    tolerance = WITNESS_TOLERANCE * np.abs(A).max(axis=1, initial=0)
+    return np.all(points @ A.T - self.b.reshape(-1) <= tolerance, axis=1)
+
+  def add_witnesses(self, points: list[np.ndarray]) -> None:
+    for x in points:
+      if len(self.witnesses) >= MAX_WITNESSES:
+        return
+      if not any(np.array_equal(x, y) for y in self.witnesses):
+        self.witnesses.append(x)
+
+  def minimize(self, lp: bool = False) -> 'Poly':
+    """ Equivalent polyhedron without duplicated and redundant constraints,
+    the (costly) removal of the constraints implied by the others only if lp """
+    if self.status != Status.UNKNOWN or len(self.variables) == 0:
+      return self
+    A = self.A.reshape(-1, len(self.variables))
+    minimized = minimize_constraints(A, self.b, lp)
+    if minimized is None:
+      return Poly.bottom()
+    poly = Poly(self.variables, *minimized)
+    poly.add_witnesses(self.witnesses)
+    return poly
+
+  def minimize_above_threshold(self) -> 'Poly':
+    threshold = get_minimize_threshold()
+    if threshold is None or len(self.b.reshape(-1)) <= threshold:
+      return self
+    return self.minimize(get_minimize_lp())
+
+  def bounding_box(self, lp: bool = False) -> Box | None:
+    """ Interval hull, from the bound rows or, if lp, from 2 LPs per variable """
+    if self.status != Status.UNKNOWN:
+      return None
+    if lp not in self.boxes:
+      self.boxes[lp] = self._lp_box() if lp else variable_bounds(self.A.reshape(-1, len(self.variables)), self.b.reshape(-1))
+    return self.boxes[lp]
+
+  def _lp_box(self) -> Box | None:
+    lower, upper = (bound.copy() for bound in self.bounding_box()) # type: ignore
+    n = len(self.variables)
+    for i in range(n):
+      for direction, bound in [(1, lower), (-1, upper)]:
+        obj = np.zeros(n)
+        obj[i] = direction
+        try:
+          success, x = solve(obj, self.A, self.b)
+        except SolverError:
+          continue
+        if not success:
+          self.status = Status.BOTTOM
+          return None
+        self.add_witnesses([x])
+        # optima on the solver box stand for unbounded directions
+        if abs(x[i]) < LP_BOUND - 1:
+          bound[i] = x[i]
+    return lower, upper
 
   def is_bottom(self) -> bool:
     if self.status == Status.BOTTOM:
       return True
     if self.status == Status.TOP:
       return False
-    obj = np.array([0] * len(self.variables))
-    try:
-      result, _ = solve(obj, self.A, self.b)
-    except SolverError:
-      self.status = Status.TOP
+    if any(self.contains(x) for x in self.witnesses):
       return False
+    cache = get_feasibility_cache()
+    key = canonical_key(self.A, self.b) if cache else None
+    entry = cache.load(key) if cache and key else None
+    if entry is not None:
+      result, center = entry
+    else:
+      try:
+        result, center = self.chebyshev_center()
+      except SolverError:
+        self.status = Status.TOP
+        return False
+      if cache and key:
+        cache.store(key, result, center if result else None)
     if not result:
       self.status = Status.BOTTOM
       return True
+    self.add_witnesses([center])
     return False
 
+  def chebyshev_center(self) -> tuple[bool, np.ndarray]:
+    """ Centre of the largest ball inside the poly, which is feasible iff
+    this LP is. Being away from the borders, the centre is a witness that
+    more often lies in the polyhedra intersecting this one. """
+    n = len(self.variables)
+    # max r such that A x + r ||A_i|| <= b and r >= 0
+    A_ball, b_ball = self.ball_rows()
+    A_ball = np.vstack((A_ball, np.append(np.zeros(n), -1)))
+    b_ball = np.append(b_ball, 0)
+    obj = np.append(np.zeros(n), -1)
+    success, x = solve(obj, A_ball, b_ball)
+    return success, x[:n] if success else x
+
   def is_top(self) -> bool:
     if self.status == Status.TOP:
       return True
@@ -171,7 +397,8 @@ class Poly(AbstractDomain):
       return False
     return False # TODO: how to check if it is top? Need domain bounds
 
-  def to_inequalities(self) -> list[sp.core.relational.LessThan]:
+  def to_inequalities(self) -> 'list[sp.core.relational.LessThan]':
+    import sympy as sp
     # assert(not self.is_bottom() and not self.is_top())
     sym = sp.Matrix(self.variables)
     A = sp.Matrix(self.A)
@@ -199,27 +426,91 @@ class Poly(AbstractDomain):
       str_inequalities = str_inequalities.replace(variable, from_harmonic_to_variable(variable))
     return str_inequalities
   
-  def count_integers_between(self, lowerbound:int=0, upperbound:int=20) -> int:
+  def count_integers_between(self, lowerbound:int=0, upperbound:int=20) -> int | float:
+    """ Number of integer points with every variable in range(lowerbound, upperbound) """
     if self.is_bottom():
       return 0
     if self.is_top():
-      return int('inf')
-    k = len(self.variables)
-    points = list(product(*(range(lowerbound, upperbound) for i in range(k))))
-    count = [all([np.dot(A, point) <= b for A, b in zip(self.A, self.b)]) for point in points]
-    return sum(count)
-  
-def intersecting_pairs(polys:list[Poly]) -> list[tuple[int, int]]:
-  # find all the poly that intersect
-  intersecting = set()
-  for i in range(len(polys)):
-    for j in range(len(polys)):
-      if i != j and (j, i) not in intersecting and polys[i].does_intersect(polys[j]):
-        intersecting.add((i, j))
-  return list(intersecting)
+      return float('inf')
+    n = len(self.variables)
+    box = self.bounding_box(lp=True)
+    if box is None:
+      return 0
+    lower = np.maximum(box[0], np.full(n, lowerbound))
+    upper = np.minimum(box[1], np.full(n, upperbound - 1))
+    return count_integer_points(self.A.reshape(-1, n), self.b.reshape(-1), lower, upper)
+
+def intersection_points(polys: tuple[list[AbstractDomain], list[AbstractDomain]], chunk: tuple[list[tuple[int, int]], int]) -> list[np.ndarray | None]:
+  """ For each pair (i, j) of the chunk, a point in both xs[i] and ys[j]
+  (empty if there is no such point at hand), or None if they do not
+  intersect. Once fewer than least pairs of the chunk can still intersect,
+  the others are not checked and given as None. """
+  (xs, ys), (pairs, least) = polys, chunk
+  acc = []
+  found = 0
+  # consecutive pairs with the same xs[i] share its solver session
+  session, owner = None, None
+  for k, (i, j) in enumerate(pairs):
+    if found + len(pairs) - k < least:
+      return acc + [None] * (len(pairs) - k)
+    x, y = xs[i], ys[j]
+    if owner != i and isinstance(x, Poly) and x.status == Status.UNKNOWN:
+      session, owner = x.session(), i
+    if not (x.does_intersect(y, session) if owner == i else x.does_intersect(y)):
+      acc.append(None)
+      continue
+    found += 1
+    points = []
+    # top and bottom have no variables, their points are of no use to the other
+    if isinstance(x, Poly) and isinstance(y, Poly) and x.status == Status.UNKNOWN and y.status == Status.UNKNOWN:
+      points = [w for w in x.witnesses if y.contains(w)] + [w for w in y.witnesses if x.contains(w)]
+    acc.append(points[0] if len(points) > 0 else np.empty(0))
+  return acc
+
+def chunked(pairs: list[tuple[int, int]]) -> list[tuple[list[tuple[int, int]], int]]:
+  # a few chunks per worker, to balance the load
+  size = max(1, -(-len(pairs) // (4 * get_workers())))
+  return [(pairs[k:k + size], 0) for k in range(0, len(pairs), size)]
+
+def intersecting_chunks(xs: list[AbstractDomain], ys: list[AbstractDomain], chunks: Iterable[tuple[list[tuple[int, int]], int]]) -> Iterator[list[bool]]:
+  """ Yield, for each chunk (see intersection_points), whether xs[i] and
+  ys[j] intersect for its pairs (i, j), checked over the worker processes.
+
+  The points found by the workers are kept as witnesses, as a sequential
+  check would. Closing the iterator early cancels the chunks left; with a
+  single worker, chunks are only taken from the iterable when needed.
+  """
+  chunks, taken = tee(chunks)
+  results = imap_chunks(intersection_points, (xs, ys), chunks)
+  try:
+    for (pairs, _), points in zip(taken, results):
+      for (i, j), point in zip(pairs, points):
+        if point is not None and len(point) > 0:
+          xs[i].add_witnesses([point]) # type: ignore
+          ys[j].add_witnesses([point]) # type: ignore
+      yield [point is not None for point in points]
+  finally:
+    results.close()
+
+def intersecting_pairs(polys:list[AbstractDomain]) -> list[tuple[int, int]]:
+  # find all the poly that intersect, checking only the ones whose boxes overlap
+  boxes = [p.bounding_box() for p in polys]
+  for i, (p, box) in enumerate(zip(polys, boxes)):
+    # an unbounded box overlaps too much, a bounded one costs 2 LPs per
+    # variable, worth it only when that is less than one LP per other poly
+    if box is not None and not np.isfinite(box).all() and len(polys) > 2 * len(box[0]):
+      boxes[i] = p.bounding_box(lp=True)
+  candidates = overlapping_pairs(boxes)
+  intersecting = [flag for flags in intersecting_chunks(polys, polys, chunked(candidates)) for flag in flags]
+  return [pair for pair, flag in zip(candidates, intersecting) if flag]
 
 def intersecting_cliques(polys:list[Poly]) -> dict[int, set[frozenset[int]]]:
-  edges = intersecting_pairs(polys)
+  return maximal_cliques(intersecting_pairs(polys))
+
+def maximal_cliques(edges: list[tuple[int, int]]) -> dict[int, set[frozenset[int]]]:
+  """ For each node with some edge, the other nodes of each maximal clique
+  containing it """
+  import networkx as nx
   graph = nx.Graph(edges)
   cliques = list(nx.find_cliques(graph))
 
@@ -237,12 +528,12 @@ def intersecting_cliques(polys:list[Poly]) -> dict[int, set[frozenset[int]]]:
 def intersecting_components(polys:list[Poly]) -> dict[int, set[int]]:
   warning("Deprecated")
   # find all the poly that intersect
-  intersecting = {}
-  for i in range(len(polys)):
-    intersecting[i] = set()
-    for j in range(len(polys)):
-      if i != j and polys[i].does_intersect(polys[j]):
-        intersecting[i].add(j)
+  intersecting = {i: set() for i in range(len(polys))}
+  pairs = [(i, j) for i in range(len(polys)) for j in range(len(polys)) if i != j]
+  flags = [flag for flags in intersecting_chunks(polys, polys, chunked(pairs)) for flag in flags]
+  for (i, j), flag in zip(pairs, flags):
+    if flag:
+      intersecting[i].add(j)
   return intersecting
 
   acc = intersecting_cliques(polys)
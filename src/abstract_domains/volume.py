@@ -0,0 +1,85 @@
+""" Monte Carlo estimates of the share of a box covered by sets of points.
+
+Points are drawn uniformly in a box, in batches, and the fraction falling
+inside each set is reported with a Wilson confidence interval. A point
+inside several disjuncts counts once, so disjunctions are measured as
+unions and not as sums.
+"""
+from statistics import NormalDist
+from typing import Callable
+
+import numpy as np
+
+from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.boxes import Box
+
+
+DEFAULT_SAMPLES = 10000
+CONFIDENCE = 0.95
+SEED = 0
+# points tested at once
+BATCH_SIZE = 4096
+
+SAMPLES = DEFAULT_SAMPLES
+
+def set_samples(samples: int) -> None:
+  global SAMPLES
+  SAMPLES = samples
+
+def get_samples() -> int:
+  return SAMPLES
+
+class VolumeEstimate:
+  def __init__(self, hits: int, samples: int, confidence: float = CONFIDENCE):
+    self.hits = hits
+    self.samples = samples
+    self.confidence = confidence
+
+  def interval(self) -> tuple[float, float]:
+    """ Wilson score interval of the share """
+    if self.samples == 0:
+      return 0., 1.
+    z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+    p, n = self.hits / self.samples, self.samples
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0., center - half), min(1., center + half)
+
+  @property
+  def value(self) -> float:
+    return self.hits / self.samples if self.samples > 0 else 0.
+
+  def __str__(self):
+    lower, upper = self.interval()
+    return f'{self.value:.4g} [{lower:.4g}, {upper:.4g}] ({self.confidence:.0%} confidence, {self.samples} samples)'
+
+  def __repr__(self):
+    return str(self)
+
+def finite_box(domains: list[AbstractDomain]) -> Box:
+  """ Box around all the domains, with LPs where the rows leave it unbounded """
+  boxes = []
+  for domain in domains:
+    if domain.is_bottom():
+      continue
+    box = domain.bounding_box()
+    if box is not None and not np.isfinite(box).all():
+      box = domain.bounding_box(lp=True)
+    if box is None or not np.isfinite(box).all():
+      raise Exception('Volumes need bounded preconditions, bound every input')
+    boxes.append(box)
+  if len(boxes) == 0:
+    raise Exception('Volumes need at least one precondition that is not bottom')
+  return np.min([box[0] for box in boxes], axis=0), np.max([box[1] for box in boxes], axis=0)
+
+def count_hits(inside: Callable[[np.ndarray], np.ndarray], box: Box, samples: int, seed: int = SEED) -> np.ndarray:
+  """ Number of the samples drawn uniformly in box that fall in each of the
+  sets given by inside, a function from a batch of points to a mask of
+  shape (sets, points) """
+  rng = np.random.default_rng(seed)
+  hits = None
+  for start in range(0, samples, BATCH_SIZE):
+    points = rng.uniform(box[0], box[1], size=(min(BATCH_SIZE, samples - start), len(box[0])))
+    batch = np.atleast_2d(inside(points)).sum(axis=1)
+    hits = batch if hits is None else hits + batch
+  return hits if hits is not None else np.zeros(0, dtype=int)
@@ -1,4 +1,5 @@
 from json import load
+from math import ceil
 from logging import debug, error, warning
 from pathlib import Path
 from src.utils.colors import ENDC, RED
@@ -12,6 +13,7 @@ class Buckets:
       ctx = load(f)
 
     self.interactive = False
+    self.adaptive = False
     self.type = ctx['type']
 
     try:
@@ -22,6 +24,14 @@ class Buckets:
         rule = ctx['rule']
         ranges = zip(range(start, end, step), range(start+step, end+step, step))
         self.buckets = [Bucket(rule.format(l, min(u, end)), id=i) for i, (l, u) in enumerate(ranges)]
+      elif ctx['type'] == "adaptive":
+        self.start, self.end, self.step = ctx['start'], ctx['end'], ctx['step']
+        self.rule = ctx['rule']
+        # coarse partition, each part a multiple of the target step
+        width = ceil((self.end - self.start) / ctx.get('initial', 4) / self.step) * self.step
+        self.ranges = [(l, min(l + width, self.end)) for l in range(self.start, self.end, width)]
+        self.buckets = [Bucket(self.rule.format(l, u), id=i) for i, (l, u) in enumerate(self.ranges)]
+        self.adaptive = True
       elif ctx['type'] == "interactive":
         start, step = ctx['start'], ctx['step']
         name = ctx['name']
@@ -41,7 +51,7 @@ class Buckets:
           labels = ["NETWORK_BUCKET"] * ctx['outputs']
         self.buckets = [Bucket(l, i) for i, l in enumerate(labels)]
       else:
-        raise Exception(f'Unknown type {ctx["type"]} for buckets. Supported types are: direct, iterator, interactive')
+        raise Exception(f'Unknown type {ctx["type"]} for buckets. Supported types are: direct, iterator, adaptive, interactive, network')
     except KeyError as e:
       error(f'Key {RED}{e}{ENDC} not found in buckets file {RED}{path.name}{ENDC}')
       error("For example, a buckets file should look like this:" + """
@@ -60,6 +70,15 @@ class Buckets:
     "step": 10,
     "rule": "result >= {} and result < {}"
   }
+  or like this, to start from 4 buckets and split them only where needed:
+  {
+    "type": "adaptive",
+    "start": 0,
+    "end": 100,
+    "step": 10,
+    "initial": 4,
+    "rule": "result >= {} and result < {}"
+  }
   or
   {
     "type": "interactive",
@@ -80,6 +99,35 @@ class Buckets:
   def __getitem__(self, key: int):
     return self.buckets[key]
 
+  def __len__(self):
+    return len(self.buckets)
+
+  def can_refine(self, index: int) -> bool:
+    if not self.adaptive:
+      return False
+    lower, upper = self.ranges[index]
+    return upper - lower > self.step
+
+  def refine(self, indices: set[int]) -> list[int | None]:
+    """ Split each adaptive bucket in indices into two halves aligned to the step.
+
+    Buckets are renumbered, the returned list holds for each new bucket the
+    index of the bucket it was before if left untouched, None if it is new.
+    """
+    ranges, origins = [], []
+    for i, (lower, upper) in enumerate(self.ranges):
+      if i in indices and self.can_refine(i):
+        middle = lower + ceil((upper - lower) / 2 / self.step) * self.step
+        ranges += [(lower, middle), (middle, upper)]
+        origins += [None, None]
+      else:
+        ranges.append((lower, upper))
+        origins.append(i)
+    self.ranges = ranges
+    self.buckets = [Bucket(self.rule.format(l, u), id=i) for i, (l, u) in enumerate(ranges)]
+    debug('Refined buckets:\n' + add_prefix_each_line(str(self)))
+    return origins
+
 class Bucket:
   def __init__(self, condition: str, id: int=-1):
     self.condition = condition
@@ -8,8 +8,6 @@ from src.input_bounds import InputBounds
 from src.abstract_domains.abstract_domain import AbstractDomain
 
 
-TMP_DIR = Path('.tmp')
-
 def read_engine_conf(conf_path: Path):
   # read json conf file, required "path"
   with open(conf_path, 'r') as f:
@@ -29,4 +27,20 @@ class Engine(ABC):
 
   @abstractmethod
   def get_variables(self) -> list[str]:
-    pass
\ No newline at end of file
+    pass
+
+  def tiers(self) -> list['Engine']:
+    """ Engines to run in order of increasing precision (and cost).
+
+    The first one runs on every bucket, each of the following ones only on
+    the buckets that the previous tiers did not settle.
+    """
+    return [self]
+
+  def close(self) -> None:
+    """ Release the resources (e.g., worker processes) held by the engine """
+    pass
+
+  def fingerprint(self, bucket: Bucket) -> str | None:
+    """ Hash of everything the result of run(bucket) depends on, None if not cacheable """
+    return None
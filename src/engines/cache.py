@@ -0,0 +1,100 @@
+from hashlib import sha256
+from logging import debug, warning
+import os
+from pathlib import Path
+
+from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.interchange import read_precondition, write_precondition
+
+
+DEFAULT_CACHE_DIR = Path('.cache')
+DEFAULT_CACHE_SIZE_MB = 256
+
+def digest(*parts: str | bytes) -> str:
+  # length-prefixed, so that ("ab", "c") and ("a", "bc") do not collide
+  h = sha256()
+  for part in parts:
+    data = part.encode('utf-8') if isinstance(part, str) else part
+    h.update(len(data).to_bytes(8, 'little'))
+    h.update(data)
+  return h.hexdigest()
+
+def file_digest(path: Path) -> str:
+  if not path.is_file():
+    return digest(str(path))
+  h = sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+def tree_digest(root: Path, pattern: str = '*.py') -> str:
+  """ Hash of the files matching pattern under root, and of their paths """
+  if not root.is_dir():
+    return digest(str(root))
+  files = sorted(path for path in root.rglob(pattern) if path.is_file())
+  return digest(*[part for path in files for part in (path.relative_to(root).as_posix(), file_digest(path))])
+
+class EngineCache:
+  """ Content-addressed store of engine preconditions.
+
+  Entries are keyed by Engine.fingerprint and stored in the interchange
+  format, with the original variable names, so that a hit can be remapped to
+  the harmonic names of the current process. The least recently used entries are evicted whenever the
+  directory grows over max_bytes.
+  """
+  def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE_MB << 20):
+    self.directory = directory
+    self.max_bytes = max_bytes
+    self.directory.mkdir(parents=True, exist_ok=True)
+
+  def path(self, key: str) -> Path:
+    return self.directory / f'{key}.impp'
+
+  def load(self, key: str) -> AbstractDomain | None:
+    path = self.path(key)
+    try:
+      with open(path, 'rb') as f:
+        precondition = read_precondition(f)
+    except FileNotFoundError:
+      return None
+    except Exception as e:
+      warning(f'Discarding corrupted cache entry {path.name}: {e}')
+      path.unlink(missing_ok=True)
+      return None
+    os.utime(path) # mark as recently used
+    debug(f'Cache hit {key[:12]}')
+    return precondition
+
+  def store(self, key: str, precondition: AbstractDomain) -> None:
+    path = self.path(key)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+      write_precondition(f, precondition)
+    os.replace(tmp_path, path)
+    debug(f'Cache store {key[:12]}')
+    self.evict()
+
+  def evict(self) -> None:
+    entries = []
+    for path in self.directory.glob('*.impp'):
+      try:
+        entries.append((path.stat(), path))
+      except FileNotFoundError: # evicted by a concurrent run
+        continue
+    total = sum(stat.st_size for stat, _ in entries)
+    for stat, path in sorted(entries, key=lambda x: x[0].st_mtime):
+      if total <= self.max_bytes:
+        break
+      path.unlink(missing_ok=True)
+      total -= stat.st_size
+      debug(f'Cache evict {path.stem[:12]}')
+
+ENGINE_CACHE: EngineCache | None = None
+
+def set_engine_cache(cache: EngineCache | None) -> None:
+  global ENGINE_CACHE
+  ENGINE_CACHE = cache
+
+def get_engine_cache() -> EngineCache | None:
+  return ENGINE_CACHE
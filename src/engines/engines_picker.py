@@ -2,21 +2,27 @@ from logging import debug
 from typing import cast
 
 from src.engines.base import Engine
-from src.utils.picker import choose, available, to_class_name
+from src.utils.picker import Registry, choose, available
 
 
 # add here all available engines
-from src.engines.interproc import InterprocEngine, InterprocFastEngine, InterprocStrongEngine
-from src.engines.libra import LibraEngine, DisjunctiveCompletionEngine
+ENGINES: Registry = {
+  'interproc': 'src.engines.interproc:InterprocEngine',
+  'interproc-fast': 'src.engines.interproc:InterprocFastEngine',
+  'interproc-strong': 'src.engines.interproc:InterprocStrongEngine',
+  'interproc-tiered': 'src.engines.interproc:InterprocTieredEngine',
+  'libra': 'src.engines.libra:LibraEngine',
+  'disjunctive-completion': 'src.engines.libra:DisjunctiveCompletionEngine',
+  'backward-relu': 'src.engines.relu:BackwardReluEngine',
+}
 
 def choose_engine(engine: str) -> type[Engine]:
-  engine_class_name = to_class_name(engine, 'Engine')
-  EngineClass = cast(type[Engine], choose(engine_class_name, globals(), Engine))
-  debug(f'Chosen engine: {engine_class_name}')
+  EngineClass = cast(type[Engine], choose(engine, ENGINES, Engine))
+  debug(f'Chosen engine: {EngineClass.__name__}')
   return EngineClass
 
 def available_engines():
-  return available('Engine', globals())
+  return available(ENGINES)
 
 def default_engine():
-  return 'interproc'
\ No newline at end of file
+  return 'interproc'
@@ -1,12 +1,16 @@
-from logging import debug
+import json
+from logging import debug, warning
 from pathlib import Path
 import re
 import subprocess
 from src.buckets import Bucket
 
-from src.engines.base import TMP_DIR, read_engine_conf, Engine
+from src.engines.base import read_engine_conf, Engine
+from src.engines.cache import digest, file_digest
 from src.program import Program, SPLProgram
 from src.input_bounds import InputBounds, SPLInputBounds
+from src.utils.flags import get_tier_budget
+from src.utils.scratch import scratch_dir
 from src.utils.string import clean, from_variable_to_harmonic
 from src.abstract_domains.poly import Poly
 
@@ -56,18 +60,22 @@ class InterprocEngine(Engine):
     assert(isinstance(program, SPLProgram))
     assert(isinstance(inputs, SPLInputBounds))
 
-    TMP_DIR.mkdir(parents=True, exist_ok=True)
     conf = read_engine_conf(config)
     self.engine_path = Path(conf['path'])
     self.args = conf["args"]
     if not self.engine_path.exists():
       raise Exception(f'Engine path for interproc ({self.engine_path}) does not exist')
+    self.conf_digest = digest(json.dumps(conf, sort_keys=True), file_digest(self.engine_path))
     
-    self.base_program = program.replace_input_bounds(inputs, TMP_DIR)
+    self.base_program = program.replace_input_bounds(inputs, scratch_dir())
     if conf.get('unroll', False):
-      self.base_program = self.base_program.unroll_loops(int(conf['unroll']), TMP_DIR)
+      self.base_program = self.base_program.unroll_loops(int(conf['unroll']), scratch_dir())
 
     self.inv: None | InterprocInv = None
+    self.timeout: float | None = None
+
+  def fingerprint(self, bucket: Bucket) -> str:
+    return digest('interproc', self.conf_digest, self.base_program.bucket_content(bucket), bucket.condition)
 
   def create_command(self, program: SPLProgram):
     return [str(self.engine_path.absolute()), *self.args, str(program.path.absolute())]
@@ -86,13 +94,19 @@ class InterprocEngine(Engine):
 
   def run(self, bucket: Bucket) -> Poly:
     variables = self.base_program.get_variables()
-    program = self.base_program.replace_bucket(bucket, TMP_DIR)
+    program = self.base_program.replace_bucket(bucket, scratch_dir())
 
     command = self.create_command(program)
     str_command = ' '.join(command)
     debug(f'Running interproc: \n  > {str_command}')
     process = subprocess.Popen(command, stdout=subprocess.PIPE)
-    output, error = process.communicate()
+    try:
+      output, error = process.communicate(timeout=self.timeout)
+    except subprocess.TimeoutExpired:
+      process.kill()
+      process.communicate()
+      warning(f'Interproc out of its {self.timeout}s budget for bucket ({bucket}), returning top')
+      return Poly.top()
     if error:
       raise Exception(f'Error running command: {str_command}\n\n{error}')
     else:
@@ -112,4 +126,30 @@ class InterprocFastEngine(InterprocEngine):
 
 class InterprocStrongEngine(InterprocEngine):
   def __init__(self, program: Program, inputs: InputBounds):
-    super().__init__(program, inputs, Path("./engines/interproc-strong.json"))
\ No newline at end of file
+    super().__init__(program, inputs, Path("./engines/interproc-strong.json"))
+
+class InterprocTieredEngine(Engine):
+  """ Runs interproc-fast on every bucket, then escalates to interproc and
+  interproc-strong only the buckets whose precondition is not precise
+  enough. Each run of each tier gets the wall-clock budget --tier-budget.
+  """
+  def __init__(self, program: Program, inputs: InputBounds):
+    self.engines: list[InterprocEngine] = [
+      InterprocFastEngine(program, inputs),
+      InterprocEngine(program, inputs),
+      InterprocStrongEngine(program, inputs),
+    ]
+    for engine in self.engines:
+      engine.timeout = get_tier_budget()
+
+  def tiers(self) -> list[Engine]:
+    return list(self.engines)
+
+  def fingerprint(self, bucket: Bucket) -> str:
+    return self.engines[0].fingerprint(bucket)
+
+  def run(self, bucket: Bucket) -> Poly:
+    return self.engines[0].run(bucket)
+
+  def get_variables(self) -> list[str]:
+    return self.engines[0].base_program.get_variables()
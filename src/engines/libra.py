@@ -1,16 +1,22 @@
 
+import json
 from logging import debug
+import os
 from pathlib import Path
-import re
 import subprocess
+from tempfile import TemporaryFile
+from typing import IO, BinaryIO, Iterable, Iterator
 from src.abstract_domains.abstract_domain import AbstractDomain
 from src.abstract_domains.disjunctive_poly import DisjunctivePoly
+from src.abstract_domains.interchange import iter_polyhedra, read_header
 from src.abstract_domains.poly import Poly
 from src.buckets import Bucket
-from src.engines.base import TMP_DIR, Engine, read_engine_conf
+from src.engines.base import Engine, read_engine_conf
+from src.engines.cache import digest, tree_digest
 from src.input_bounds import InputBounds, NetworkInputBounds
 from src.program import NetworkProgram, Program
 from src.utils.progress_bar import subprogress_bar
+from src.utils.scratch import scratch_dir
 from src.utils.string import from_variable_to_harmonic
 
 
@@ -25,6 +31,51 @@ CONFIGURATION_TEMPLATE = """
 class LibraEngine:
   pass
 
+class DisjunctiveCompletionWorker:
+  """ Long-lived engine process answering one bucket at a time.
+
+  The process is started once with the worker arguments, and it loads the
+  network and the configuration a single time. Each request is a bucket id
+  written on a line of its stdin. The answer on its stdout is what a one-shot
+  run prints for that bucket: in text mode it ends with the closing '=== ==='
+  guard, in binary mode it is a single interchange record. Closing stdin
+  terminates the process.
+  """
+  def __init__(self, command: list[str], binary: bool):
+    self.command = command
+    self.binary = binary
+    # forked processes inherit the worker, but only its owner may talk to it
+    self.owner = os.getpid()
+    self.stderr = TemporaryFile()
+    debug(f'Starting engine worker: {" ".join(command)}')
+    self.process = subprocess.Popen(
+      command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.stderr,
+      text=not binary, bufsize=-1 if binary else 1)
+    self.errors_seen = 0
+
+  def request(self, bucket: Bucket) -> IO:
+    assert self.process.stdin is not None and self.process.stdout is not None
+    if self.process.poll() is not None:
+      self.check_errors()
+      raise Exception(f'Engine worker exited with code {self.process.returncode}')
+    line = f'{bucket.id}\n'
+    self.process.stdin.write(line.encode('utf-8') if self.binary else line)
+    self.process.stdin.flush()
+    return self.process.stdout
+
+  def check_errors(self) -> None:
+    self.stderr.seek(self.errors_seen)
+    error = self.stderr.read()
+    self.errors_seen += len(error)
+    if error:
+      raise Exception(f'Error from engine worker: {" ".join(self.command)}\n\n{error}')
+
+  def close(self) -> None:
+    if self.process.stdin is not None and not self.process.stdin.closed:
+      self.process.stdin.close()
+    self.process.wait()
+    self.stderr.close()
+
 class DisjunctiveCompletionEngine(Engine):
   def __init__(self, program: Program, input_bounds: InputBounds):
     assert(isinstance(program, NetworkProgram))
@@ -34,13 +85,12 @@ class DisjunctiveCompletionEngine(Engine):
     self.input_bounds = input_bounds
     self.variables = self.program.get_variables()
 
-    TMP_DIR.mkdir(parents=True, exist_ok=True)
     configuration = "{" + CONFIGURATION_TEMPLATE.format(
       program.path.absolute(),
       input_bounds.lower_bound,
       input_bounds.upper_bound
     ) + "}"
-    configuration_path = Path(TMP_DIR / 'network_configuration.json')
+    configuration_path = scratch_dir() / 'network_configuration.json'
     configuration_path.write_text(configuration)
     self.configuration_path = configuration_path
 
@@ -48,11 +98,22 @@ class DisjunctiveCompletionEngine(Engine):
     conf = read_engine_conf(config)
     self.engine_path = str(Path(conf['path']).absolute())
     self.args = conf["args"]
+    # "binary": the engine writes its polyhedra in the interchange format
+    self.binary = conf.get('format', 'text') == 'binary'
+    # "worker": arguments starting the engine as a long-lived worker
+    self.worker_args: list[str] | None = conf.get('worker', None)
+    self.worker: DisjunctiveCompletionWorker | None = None
     self.command = ["python", self.engine_path] + self.args + [str(self.configuration_path.absolute())]
     self.str_command = ' '.join(self.command)
+    self.conf_digest = digest(
+      json.dumps(conf, sort_keys=True),
+      # main.py is only the entry point, every source file next to it counts
+      tree_digest(Path(self.engine_path).parent),
+      configuration,
+      program.content)
 
   @staticmethod
-  def parse_disjunctive_completion_output(variables: list[str], output: str) -> AbstractDomain:
+  def parse_disjunctive_completion_output(variables: list[str], output: str | Iterable[str]) -> AbstractDomain:
     """ Example output:
     Output composition (by testing): {0: 55871, 1: 44129} 
 
@@ -304,35 +365,116 @@ End backward analysis for bucket 1 (with 4 polyhedra)
 -0.0x -0.0y -0.0z -0.0w -1.0p <= 0.0
 === ===
     """
-    # first, match all disjunctive polyhedra within two guards '=== ==='
-    disjunctive_polyhedra = []
-    matched_disjunction = re.findall(r'=== ===(.+?)\n=== ===', output, re.DOTALL)[0]
-    
-    matched_disjunction = matched_disjunction.split('===')[1:]
-    str_disjunction = [
-      ctx.split('\n')[1:-1]
-      for ctx in matched_disjunction
+    lines = output.splitlines() if isinstance(output, str) else output
+    disjunction = [
+      poly
+      for poly in subprogress_bar(
+        DisjunctiveCompletionEngine.iter_disjunctive_completion_output(variables, lines),
+        desc='Parsing disjunctive polyhedra')
+      if not poly.is_bottom()
     ]
+    return DisjunctivePoly(disjunction)
+
+  @staticmethod
+  def iter_disjunctive_completion_output(variables: list[str], lines: Iterable[str]) -> Iterator[Poly]:
+    """ Yield the polyhedra of the first disjunction guarded by '=== ===', one
+    '=== [k/n]' block at a time, as soon as the block is complete.
+
+    Lines are consumed lazily, so only the current block is kept in memory.
+    """
+    inside, block = False, None
+    for line in lines:
+      line = line.strip()
+      if line.startswith('=== ==='):
+        if inside:
+          if block is not None:
+            yield Poly.from_string_constraints(variables, from_variable_to_harmonic, block)
+          return
+        inside = True
+      elif inside and line.startswith('=== ['):
+        if block is not None:
+          yield Poly.from_string_constraints(variables, from_variable_to_harmonic, block)
+        block = []
+      elif inside and block is not None and line:
+        block.append(line)
+    raise Exception('Could not find a disjunction guarded by "=== ===" in the output')
+
+  @staticmethod
+  def read_binary_output(stream: BinaryIO) -> AbstractDomain:
+    header = read_header(stream)
+    if header is None:
+      raise Exception('Empty precondition stream')
+    _, _, variables = header
     disjunction = [
-      Poly.from_string_constraints(variables, from_variable_to_harmonic, constraints)
-      for constraints in subprogress_bar(str_disjunction, desc='Parsing disjunctive polyhedra')
+      poly
+      for poly in subprogress_bar(iter_polyhedra(stream, variables), desc='Reading disjunctive polyhedra')
+      if not poly.is_bottom()
     ]
-    return DisjunctivePoly(disjunction).remove_bottoms()
+    return DisjunctivePoly(disjunction)
 
+  def fingerprint(self, bucket: Bucket) -> str:
+    return digest('disjunctive-completion', self.conf_digest, str(bucket.id), bucket.condition)
+
+  def __getstate__(self):
+    # the worker process belongs to the process that started it
+    state = self.__dict__.copy()
+    state['worker'] = None
+    return state
+
+  def run_worker(self, bucket: Bucket) -> AbstractDomain:
+    assert self.worker_args is not None
+    if self.worker is None or self.worker.owner != os.getpid():
+      command = [self.command[0], "-Xfrozen_modules=off", "--"] + self.command[1:] + self.worker_args
+      self.worker = DisjunctiveCompletionWorker(command, self.binary)
+    debug(f'Requesting bucket {bucket.id} to the engine worker')
+    stream = self.worker.request(bucket)
+    try:
+      if self.binary:
+        precondition = DisjunctiveCompletionEngine.read_binary_output(stream)
+      else:
+        precondition = DisjunctiveCompletionEngine.parse_disjunctive_completion_output(self.variables, stream)
+    except Exception:
+      self.worker.check_errors()
+      raise
+    self.worker.check_errors()
+    return precondition
+
+  def close(self) -> None:
+    if self.worker is not None and self.worker.owner == os.getpid():
+      self.worker.close()
+    self.worker = None
 
   def run(self, bucket: Bucket) -> AbstractDomain:
+    if self.worker_args is not None:
+      return self.run_worker(bucket)
     command = [self.command[0], "-Xfrozen_modules=off", "--"] + self.command[1:] + [str(bucket.id)]
     str_command = ' '.join(command)
 
     debug(f'Running command: {str_command}')
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    output, error = process.communicate()
+    with TemporaryFile() as stderr:
+      process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=not self.binary)
+      assert process.stdout is not None
+      try:
+        # parse each polyhedron while the engine is still computing the next ones
+        if self.binary:
+          precondition = DisjunctiveCompletionEngine.read_binary_output(process.stdout)
+        else:
+          precondition = DisjunctiveCompletionEngine.parse_disjunctive_completion_output(self.variables, process.stdout)
+      except Exception:
+        process.kill()
+        raise
+      finally:
+        for _ in process.stdout: # drain whatever follows the disjunction
+          pass
+        process.wait()
+      stderr.seek(0)
+      error = stderr.read()
     if error:
       raise Exception(f'Error running command: {str_command}\n\n{error}')
     else:
       debug('Command executed successfully')
-    
-    return DisjunctiveCompletionEngine.parse_disjunctive_completion_output(self.variables,output.decode('utf-8'))
+
+    return precondition
 
   def get_variables(self) -> list[str]:
     return self.program.get_variables()
\ No newline at end of file
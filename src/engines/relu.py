@@ -0,0 +1,146 @@
+from logging import debug
+from pathlib import Path
+import numpy as np
+
+from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.disjunctive_poly import DisjunctivePoly
+from src.abstract_domains.poly import Poly
+from src.buckets import Bucket
+from src.engines.base import Engine
+from src.engines.cache import digest, file_digest
+from src.input_bounds import InputBounds, NetworkInputBounds
+from src.program import NetworkProgram, Program
+from src.utils.networks import NN
+from src.utils.progress_bar import subprogress_bar
+from src.utils.string import from_variable_to_harmonic
+
+
+# the engine runs in-process, cached preconditions are only valid for this code
+SOURCE_DIGEST = file_digest(Path(__file__))
+
+def interval_bounds(nn: NN, lower_bound: float, upper_bound: float) -> list[tuple[np.ndarray, np.ndarray]]:
+  """ Pre-activation bounds of each layer (in backward order) for inputs in the box """
+  low = np.full(nn.ninputs, float(lower_bound))
+  high = np.full(nn.ninputs, float(upper_bound))
+  acc = []
+  for _, w, b, a in reversed(nn):
+    positive, negative = np.clip(w, 0, None), np.clip(w, None, 0)
+    pre_low = positive @ low + negative @ high + b
+    pre_high = positive @ high + negative @ low + b
+    acc.append((pre_low, pre_high))
+    if a == NN.RELU:
+      low, high = np.maximum(pre_low, 0), np.maximum(pre_high, 0)
+    else:
+      low, high = pre_low, pre_high
+  return list(reversed(acc))
+
+def box_constraints(low: np.ndarray, high: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  n = low.shape[0]
+  return np.vstack((np.eye(n), -np.eye(n))), np.concatenate((high, -low))
+
+def is_feasible(A: np.ndarray, c: np.ndarray, box: tuple[np.ndarray, np.ndarray]) -> bool:
+  names = [f'h{i}' for i in range(A.shape[1])]
+  return not Poly(names, np.vstack((A, box[0])), np.concatenate((c, box[1]))).is_bottom()
+
+def backward_relu(
+    polyhedra: list[tuple[np.ndarray, np.ndarray]],
+    low: np.ndarray,
+    high: np.ndarray) -> tuple[list[tuple[np.ndarray, np.ndarray]], int]:
+  """ From constraints over z = ReLU(h) to a disjunction of constraints over h.
+
+  Neurons that are stable in [low, high] are substituted directly, the other
+  ones are split one at a time into the active (h >= 0, z = h) and inactive
+  (h <= 0, z = 0) case, dropping a branch as soon as it is infeasible within
+  the pre-activation box.
+  """
+  n = low.shape[0]
+  box = box_constraints(low, high)
+  inactive = high <= 0
+  unstable = [j for j in range(n) if low[j] < 0 < high[j]]
+  infeasible = 0
+
+  frontier = []
+  for A, c in polyhedra:
+    A = A.copy()
+    A[:, inactive] = 0
+    frontier.append((A, c))
+
+  for j in unstable:
+    active_row = np.zeros((1, n))
+    active_row[0, j] = -1
+    inactive_row = -active_row
+    next_frontier = []
+    for A, c in frontier:
+      A_inactive = A.copy()
+      A_inactive[:, j] = 0
+      for A_branch, row in [(A, active_row), (A_inactive, inactive_row)]:
+        A_branch, c_branch = np.vstack((A_branch, row)), np.append(c, 0)
+        if is_feasible(A_branch, c_branch, box):
+          next_frontier.append((A_branch, c_branch))
+        else:
+          infeasible += 1
+    frontier = next_frontier
+  return frontier, infeasible
+
+class BackwardReluEngine(Engine):
+  """ In-process backward analysis of ReLU networks.
+
+  The output bucket "output k is the maximum" is propagated backward through
+  the affine and ReLU layers of the network, yielding a disjunction of
+  polyhedra over the inputs.
+  """
+  def __init__(self, program: Program, input_bounds: InputBounds):
+    assert(isinstance(program, NetworkProgram))
+    assert(isinstance(input_bounds, NetworkInputBounds))
+
+    self.program = program
+    self.input_bounds = input_bounds
+    self.nn = program.nn
+    self.variables = self.program.get_variables()
+    self.bounds = interval_bounds(self.nn, input_bounds.lower_bound, input_bounds.upper_bound)
+
+  def fingerprint(self, bucket: Bucket) -> str:
+    return digest(
+      'backward-relu',
+      SOURCE_DIGEST,
+      self.program.content,
+      str(self.input_bounds),
+      str(bucket.id))
+
+  def output_constraints(self, output: int) -> tuple[np.ndarray, np.ndarray]:
+    # y_j - y_k <= 0 for every other output j
+    if not 0 <= output < self.nn.noutputs:
+      raise Exception(f'Bucket {output} is not an output of the network ({self.nn.noutputs} outputs)')
+    A = np.zeros((self.nn.noutputs - 1, self.nn.noutputs))
+    for row, j in enumerate(j for j in range(self.nn.noutputs) if j != output):
+      A[row, j] = 1
+      A[row, output] = -1
+    return A, np.zeros(self.nn.noutputs - 1)
+
+  def run(self, bucket: Bucket) -> AbstractDomain:
+    debug(f'Backward analysis ({len(self.nn)} layers) for bucket {bucket.id} ...')
+    polyhedra = [self.output_constraints(bucket.id)]
+    layers = list(zip(self.nn, self.bounds))
+    for i, ((_, w, b, a), (low, high)) in enumerate(subprogress_bar(layers, desc='Backward layers')):
+      layer = len(layers) - i - 1
+      if a == NN.RELU:
+        polyhedra, infeasible = backward_relu(polyhedra, low, high)
+        debug(f' >> ReLU Layer {layer}: {infeasible} infeasible polyhedra, {len(polyhedra)} left')
+      polyhedra = [(A @ w, c - A @ b) for A, c in polyhedra]
+      debug(f' >> Affine Layer {layer}')
+
+    lower_bound, upper_bound = self.input_bounds.to_target()
+    A_box, c_box = box_constraints(
+      np.full(self.nn.ninputs, float(lower_bound)),
+      np.full(self.nn.ninputs, float(upper_bound)))
+    variables = [from_variable_to_harmonic(v) for v in self.variables]
+    disjunction = [
+      Poly(variables, np.vstack((A, A_box)), np.concatenate((c, c_box)))
+      for A, c in polyhedra
+    ]
+    precondition = DisjunctivePoly(disjunction).remove_bottoms()
+    debug(f'End backward analysis for bucket {bucket.id} (with {len(precondition.polyhedra)} polyhedra)')
+    return precondition
+
+  def get_variables(self) -> list[str]:
+    return self.program.get_variables()
@@ -1,10 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable
 
 from src.abstract_domains.abstract_domain import AbstractDomain
 from src.buckets import Buckets
 
 
+# what analyses of the same preconditions compute for the current variable,
+# cleared when the variable changes
+SHARED_TARGET: str | None = None
+SHARED: dict[tuple[str, int], tuple[list[AbstractDomain], Any]] = {}
+
+def shared(kind: str, target: str, pres: list[AbstractDomain], compute: Callable[[], Any]) -> Any:
+  """ Result of compute for target and pres, computed once for all the
+  analyses asking for the same kind """
+  global SHARED_TARGET
+  if target != SHARED_TARGET:
+    SHARED.clear()
+    SHARED_TARGET = target
+  key = (kind, id(pres))
+  if key not in SHARED or SHARED[key][0] is not pres:
+    SHARED[key] = (pres, compute())
+  return SHARED[key][1]
+
+def projections(target: str, pres: list[AbstractDomain]) -> list[AbstractDomain]:
+  """ The preconditions with the target variable eliminated """
+  return shared('projections', target, pres, lambda: [pre.eliminate(target) for pre in pres])
+
 class Analysis(ABC):
   @abstractmethod
   def __init__(self, pres: list[AbstractDomain], buckets:Buckets):
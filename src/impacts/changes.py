@@ -1,9 +1,11 @@
 from functools import reduce
+import numpy as np
 from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.boxes import overlaps_each
 from src.abstract_domains.disjunctive_poly import DisjunctivePoly
-from src.abstract_domains.poly import intersecting_cliques, intersecting_components
+from src.abstract_domains.poly import intersecting_chunks, intersecting_cliques, intersecting_components
 from src.buckets import Buckets
-from src.impacts.intersections import Analysis
+from src.impacts.base import Analysis, projections
 from src.utils.flags import get_older_algorithm
 from src.utils.progress_bar import progress_bar, subprogress_bar
 
@@ -14,7 +16,7 @@ def all_intersections(states, index, old=False) -> int:
   if len(states) != 2:
     raise Exception("Only 2 buckets supported in changes")
 
-  projected = [state.eliminate(index) for state in states]
+  projected = projections(index, states)
 
   # if not original:
   #   count = 0
@@ -29,44 +31,42 @@ def all_intersections(states, index, old=False) -> int:
   #       # print(local_max, count)
   #   return count
   
+  xs = projected[0].polyhedra
+  ys = projected[1].polyhedra
+  ys_boxes = [y.bounding_box() for y in ys]
+  # disjuncts whose boxes do not overlap cannot intersect, skip their LPs
+  candidates = [np.flatnonzero(overlaps_each(xi.bounding_box(), ys_boxes)) for xi in xs]
   if not old:
-    xs = projected[0].polyhedra
-    ys = projected[1].polyhedra
     abs_maximum = max(len(xs), len(ys))
     rel_maximum_counter = 0
-    outer = subprogress_bar(xs, desc=f'Changes$ rel counter=0/{abs_maximum}')
-    for i, xi in enumerate(outer): 
-      counter = 0
-      inner = subprogress_bar(ys, desc=f'Changes$ loc counter=0')
-      for j, yi in enumerate(inner):
-        if not xi.intersect(yi).is_bottom():
-          counter += 1
-          inner.set_description(f'Changes$ counter={counter}')
-        if len(inner) - j + counter < rel_maximum_counter:
-          break
-      rel_maximum_counter = max(rel_maximum_counter, counter)
-      if rel_maximum_counter >= abs_maximum:
-        return rel_maximum_counter
-      outer.set_description(f'Changes$ rel counter={rel_maximum_counter}/{abs_maximum}')
+    # the pairs of xi, whose count only matters if it can beat the maximum so far
+    chunks = (([(i, j) for j in js], rel_maximum_counter) for i, js in enumerate(candidates))
+    results = intersecting_chunks(xs, ys, chunks)
+    outer = subprogress_bar(results, total=len(xs), desc=f'Changes$ rel counter=0/{abs_maximum}')
+    try:
+      for flags in outer:
+        rel_maximum_counter = max(rel_maximum_counter, sum(flags))
+        if rel_maximum_counter >= abs_maximum:
+          return rel_maximum_counter
+        outer.set_description(f'Changes$ rel counter={rel_maximum_counter}/{abs_maximum}')
+    finally:
+      results.close()
     return rel_maximum_counter
   else:
-    xs = projected[0].polyhedra
-    ys = projected[1].polyhedra
     abs_maximum = len(xs)*len(ys)
-    rel_maximum_counter = 0
-    outer = subprogress_bar(xs, desc=f'counter=0/{abs_maximum}')
     counter = 0
-    for xi in outer: 
-      inner = subprogress_bar(ys, desc=f'counter={counter}')
-      for yi in inner:
-        if not xi.intersect(yi).is_bottom():
-          counter += 1
-          inner.set_description(f'counter={counter}')
+    chunks = (([(i, j) for j in js], 0) for i, js in enumerate(candidates))
+    results = intersecting_chunks(xs, ys, chunks)
+    outer = subprogress_bar(results, total=len(xs), desc=f'counter=0/{abs_maximum}')
+    try:
+      for flags in outer:
+        counter += sum(flags)
         if counter >= abs_maximum:
           return counter
-      rel_maximum_counter = max(rel_maximum_counter, counter)
-      outer.set_description(f'counter={rel_maximum_counter}/{abs_maximum}')
-    return rel_maximum_counter
+        outer.set_description(f'counter={counter}/{abs_maximum}')
+    finally:
+      results.close()
+    return counter
 
   # return 
   # intersections = []
@@ -3,25 +3,27 @@ from typing import cast
 
 from src.impacts.base import Analysis
 # from src.impacts.base import Analysis, NothingAnalysis
-from src.utils.picker import choose, available, to_class_name
+from src.utils.picker import Registry, choose, available
 
 
 # add here all available analyses
-# from src.impacts.intersections import IntersectionsAnalysis
-from src.impacts.outcomes import OutcomesAnalysis
-from src.impacts.range import RangeAnalysis
-from src.impacts.unused import UnusedAnalysis
-# from src.impacts.qused import *
-from src.impacts.changes import ChangesAnalysis
+ANALYSES: Registry = {
+  # 'intersections': 'src.impacts.intersections:IntersectionsAnalysis',
+  'outcomes': 'src.impacts.outcomes:OutcomesAnalysis',
+  'range': 'src.impacts.range:RangeAnalysis',
+  'unused': 'src.impacts.unused:UnusedAnalysis',
+  'qused': 'src.impacts.qused:QusedAnalysis',
+  'changes': 'src.impacts.changes:ChangesAnalysis',
+  'volume': 'src.impacts.volume:VolumeAnalysis',
+}
 
 def choose_analysis(analysis: str) -> type[Analysis]:
-  analysis_class_name = to_class_name(analysis, 'Analysis')
-  AnalysisClass = cast(type[Analysis], choose(analysis_class_name, globals(), Analysis))
-  debug(f'Chosen analysis: {analysis_class_name}')
+  AnalysisClass = cast(type[Analysis], choose(analysis, ANALYSES, Analysis))
+  debug(f'Chosen analysis: {AnalysisClass.__name__}')
   return AnalysisClass
 
 def available_analyses():
-  return available('Analysis', globals())
+  return available(ANALYSES)
 
 def default_analysis():
-  return 'outcomes'
\ No newline at end of file
+  return 'outcomes'
@@ -1,19 +1,18 @@
 from src.abstract_domains.abstract_domain import AbstractDomain
-from src.abstract_domains.poly import intersecting_components, intersecting_cliques
-from src.buckets import Buckets
-from src.impacts.base import Analysis
+from logging import warning
 
+from src.abstract_domains.poly import intersecting_components, intersecting_pairs, maximal_cliques
+from src.buckets import Buckets
+from src.impacts.base import Analysis, projections, shared
+from src.utils.cliques import adjacency, max_clique, max_clique_each_vertex
 
-def intersecting_analysis(target: int, impacts, buckets) -> dict[int, set[frozenset[int]]]:
-  impacts_without_target = []
-  for impact in impacts:
-    impact_without_target = impact.eliminate(target)
-    # print(impact_without_target)
-    impacts_without_target.append(impact_without_target)
 
-  intersecting_impacts_without_target = intersecting_cliques(impacts_without_target)
+def intersecting_edges(target: int, impacts) -> list[tuple[int, int]]:
+  return shared('edges', target, impacts, lambda: intersecting_pairs(projections(target, impacts)))
 
-  return intersecting_impacts_without_target
+def intersecting_analysis(target: int, impacts, buckets) -> dict[int, set[frozenset[int]]]:
+  # range and unused read the same cliques
+  return shared('cliques', target, impacts, lambda: maximal_cliques(intersecting_edges(target, impacts)))
 
 class IntersectionsAnalysis(Analysis):
   def __init__(self, pres: list[AbstractDomain], buckets:Buckets):
@@ -27,5 +26,17 @@ class CountIntersectionsAnalysis(IntersectionsAnalysis):
   def __init__(self, pres: list[AbstractDomain], buckets:Buckets):
     super().__init__(pres, buckets)
 
+  def graph(self, target_variable: int) -> list[int]:
+    return adjacency(len(self.impacts), intersecting_edges(target_variable, self.impacts))
+
   def run(self, target_variable: int) -> dict[int, int]:
-    return {k:max([len(v) for v in vs]) for k, vs in super().run(target_variable).items()}
+    # only the largest clique of each node, without listing the maximal ones
+    graph = self.graph(target_variable)
+    acc = {}
+    for k, (clique, upper) in max_clique_each_vertex(graph).items():
+      if graph[k] == 0:
+        continue
+      if upper > len(clique):
+        warning(f'Out of time for the largest clique of {k}, between {len(clique)} and {upper} nodes, reporting {upper}')
+      acc[k] = upper - 1
+    return acc
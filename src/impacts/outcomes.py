@@ -1,6 +1,9 @@
+from logging import warning
+
 from src.abstract_domains.abstract_domain import AbstractDomain
 from src.buckets import Buckets
 from src.impacts.intersections import CountIntersectionsAnalysis
+from src.utils.cliques import max_clique
 
 
 class OutcomesAnalysis(CountIntersectionsAnalysis):
@@ -8,5 +11,9 @@ class OutcomesAnalysis(CountIntersectionsAnalysis):
     super().__init__(pres, buckets)
 
   def run(self, target_variable: int) -> int:
-    return max(super().run(target_variable).values(), default=0)
+    # a single search for the largest clique, under a single time budget
+    clique, upper = max_clique(self.graph(target_variable))
+    if upper > len(clique):
+      warning(f'Out of time for the largest clique, between {len(clique)} and {upper} nodes, reporting {upper}')
+    return max(upper - 1, 0)
 
@@ -2,7 +2,7 @@ from logging import warning
 from src.abstract_domains.abstract_domain import AbstractDomain
 from src.abstract_domains.poly import Poly
 from src.buckets import Buckets
-from src.impacts.base import Analysis
+from src.impacts.base import Analysis, projections
 
 
 class QusedAnalysis(Analysis):
@@ -13,8 +13,7 @@ class QusedAnalysis(Analysis):
   def run(self, variable) -> int:
 
     quantities = {}
-    for i, pre in enumerate(self.pres):
-      reduced_pre = pre.eliminate(variable)
+    for i, reduced_pre in enumerate(projections(variable, self.pres)):
       assert isinstance(reduced_pre, Poly)
       count = reduced_pre.count_integers_between()
       quantities[i] = count
@@ -0,0 +1,39 @@
+from logging import debug
+
+import numpy as np
+
+from src.abstract_domains.abstract_domain import AbstractDomain
+from src.abstract_domains.volume import VolumeEstimate, count_hits, finite_box, get_samples
+from src.buckets import Buckets
+from src.impacts.base import Analysis, projections
+
+
+class VolumeAnalysis(Analysis):
+  """ Share of the input space where the variable alone decides the bucket.
+
+  For each bucket k, the inputs of the other buckets that agree on all the
+  other variables with some input of bucket k, as a fraction of the box
+  around the preconditions. The result is the largest over the buckets.
+  """
+  def __init__(self, pres: list[AbstractDomain], buckets:Buckets):
+    self.pres = pres
+    self.buckets = buckets
+    self.box = finite_box(pres)
+    self.variables = next((p.variables for p in pres if len(getattr(p, 'variables', [])) > 0), []) # type: ignore
+
+  def run(self, variable) -> VolumeEstimate:
+    projected = projections(variable, self.pres)
+    kept = [i for i, v in enumerate(self.variables) if v != variable]
+
+    def inside(points: np.ndarray) -> np.ndarray:
+      buckets = np.array([pre.contains_points(points) for pre in self.pres]) # type: ignore
+      elsewhere = buckets.sum(axis=0) - buckets > 0
+      reachable = np.array([p.contains_points(points[:, kept]) for p in projected]) # type: ignore
+      return reachable & elsewhere
+
+    samples = get_samples()
+    hits = count_hits(inside, self.box, samples)
+    estimates = [VolumeEstimate(int(h), samples) for h in hits]
+    for k, estimate in enumerate(estimates):
+      debug(f'Bucket {k}: {estimate}')
+    return max(estimates, key=lambda e: e.value, default=VolumeEstimate(0, 0))
@@ -1,33 +1,141 @@
 from logging import debug, info
+from typing import Any
 
 from src.abstract_domains.abstract_domain import AbstractDomain
-from src.buckets import Buckets
+from src.buckets import Bucket, Buckets
 from src.engines.base import Engine
+from src.engines.cache import get_engine_cache
 from src.impacts.base import Analysis
 from src.input_bounds import InputBounds
+from src.utils.parallel import imap_chunks
 from src.utils.string import add_prefix_each_line, from_variable_to_harmonic
 
 
+def run_bucket(engine: Engine, bucket: Bucket) -> AbstractDomain:
+  return engine.run(bucket)
+
+def run_tier_each_bucket(
+    engine: Engine,
+    buckets: list[Bucket],
+    workers: int = 1) -> list[AbstractDomain]:
+  cache = get_engine_cache()
+  keys = [engine.fingerprint(bucket) if cache else None for bucket in buckets]
+  acc = [cache.load(key) if cache and key else None for key in keys]
+
+  missing = [bucket for bucket, observations in zip(buckets, acc) if observations is None]
+  for bucket in missing:
+    debug(f'Running engine for bucket ({bucket})')
+  # each run blocks on its own engine subprocess, spread them over the workers,
+  # each holding a single copy of the engine (and of its warm worker) for all its buckets
+  computed = iter(list(imap_chunks(run_bucket, engine, missing, min(workers, len(missing)))))
+  for i, observations in enumerate(acc):
+    if observations is not None:
+      continue
+    acc[i] = next(computed)
+    # top also stands for an engine out of budget, do not remember it
+    if cache and keys[i] and not acc[i].is_top():
+      cache.store(keys[i], acc[i])
+  return acc
+
+def is_settled(preconditions: list[AbstractDomain], index: int) -> bool:
+  # preconditions of distinct buckets overlap only because of the engine imprecision,
+  # and every overlap can only inflate the impacts computed on top of them
+  this = preconditions[index]
+  if this.is_top():
+    return False
+  return not any(
+    this.does_intersect(other)
+    for j, other in enumerate(preconditions) if j != index)
+
 def run_engine_each_bucket(
     engine: Engine,
-    buckets: Buckets) -> list[AbstractDomain]:
-  acc = []
+    buckets: Buckets | list[Bucket],
+    workers: int = 1) -> list[AbstractDomain]:
   info("Computing backward analysis...")
-  for bucket in buckets:
-    debug(f'Running engine for bucket ({bucket})')
-    observations = engine.run(bucket)
+  tiers = engine.tiers()
+  buckets_list = list(buckets)
+  acc = run_tier_each_bucket(tiers[0], buckets_list, workers)
+
+  # escalate to the next tiers only the buckets whose precondition is too coarse
+  for tier in tiers[1:]:
+    unsettled = [i for i in range(len(acc)) if not is_settled(acc, i)]
+    if len(unsettled) == 0:
+      break
+    info(f'Escalating {len(unsettled)} bucket(s) to {tier.__class__.__name__}')
+    refined = run_tier_each_bucket(tier, [buckets_list[i] for i in unsettled], workers)
+    for i, observations in zip(unsettled, refined):
+      if not observations.is_top():
+        acc[i] = observations
+
+  for bucket, observations in zip(buckets, acc):
     debug(f"Input preconditions for bucket ({bucket}):\n{add_prefix_each_line(str(observations))}")
-    acc.append(observations)
   return acc
 
-def run_analysis_each_variable(
-    analysis: Analysis,
-    variables: list[str]) -> list[AbstractDomain]:
-  acc = []
+def run_adaptive_engine_each_bucket(
+    engine: Engine,
+    buckets: Buckets,
+    variables: list[str],
+    workers: int = 1) -> list[AbstractDomain]:
+  """ Run the engine over adaptive buckets, splitting in halves the buckets
+  whose preconditions, once a variable of interest is projected away,
+  intersect the others. Stop when no such bucket is wider than the step. """
+  acc = run_engine_each_bucket(engine, buckets, workers)
+  while True:
+    unsettled = set()
+    for variable in variables:
+      projected = [observations.eliminate(variable) for observations in acc]
+      unsettled |= {i for i in range(len(acc)) if not is_settled(projected, i)}
+    refinable = {i for i in unsettled if buckets.can_refine(i)}
+    if len(refinable) == 0:
+      break
+    info(f'Refining {len(refinable)} of {len(buckets)} bucket(s)')
+    origins = buckets.refine(refinable)
+    fresh = [bucket for bucket, origin in zip(buckets, origins) if origin is None]
+    computed = iter(run_engine_each_bucket(engine, fresh, workers))
+    acc = [acc[origin] if origin is not None else next(computed) for origin in origins]
+  return acc
+
+def run_variable(analyses: dict[str, Analysis], harmonic: str) -> dict[str, Any]:
+  return {name: analysis.run(harmonic) for name, analysis in analyses.items()}
+
+def print_result(analysis: Analysis, variable: str, result: Any) -> None:
+  print(f'Running "{analysis.__class__.__name__}" for variable "{variable}":')
+  print(add_prefix_each_line(str(result).replace("frozenset", "")))
+
+def run_analyses_each_variable(
+    analyses: dict[str, Analysis],
+    variables: list[str],
+    workers: int = 1) -> dict[str, dict[str, Any]]:
+  """ Results of each analysis for each variable, the analyses of a variable
+  sharing its projections and intersections. With several workers the
+  variables are analysed in parallel, and printed in order as they finish. """
+  acc = {}
   info("Analysis results:")
-  for variable in variables:
-    print(f'Running "{analysis.__class__.__name__}" for variable "{variable}":')
-    result = analysis.run(from_variable_to_harmonic(variable))
-    print(add_prefix_each_line(str(result).replace("frozenset", "")))
-    acc.append(analysis)
+  # fixed here, so that the workers agree with the parent process
+  harmonics = [from_variable_to_harmonic(variable) for variable in variables]
+  if workers > 1 and len(variables) > 1:
+    # the workers inherit the analyses, and their preconditions, from this process
+    results = imap_chunks(run_variable, analyses, harmonics, workers)
+    try:
+      for variable, result in zip(variables, results):
+        for name, analysis in analyses.items():
+          print_result(analysis, variable, result[name])
+        acc[variable] = result
+    finally:
+      results.close()
+    return acc
+
+  for variable, harmonic in zip(variables, harmonics):
+    acc[variable] = {}
+    for name, analysis in analyses.items():
+      result = analysis.run(harmonic)
+      print_result(analysis, variable, result)
+      acc[variable][name] = result
   return acc
+
+def impacts_report(results: dict[str, dict[str, Any]]) -> str:
+  """ One row per variable, one column per analysis """
+  names = next(iter(results.values()), {}).keys()
+  rows = [['variable', *names]] + [[variable, *[str(r).replace("frozenset", "").replace("\n", " ") for r in rs.values()]] for variable, rs in results.items()]
+  widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+  return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
@@ -43,13 +43,15 @@ class SPLProgram(Program):
       self.content.replace(match, ctx),
       dir / (self.name + '_inputbounds.spl'))
   
-  def replace_bucket(self, bucket: Bucket, dir: Path) -> 'SPLProgram':
+  def bucket_content(self, bucket: Bucket) -> str:
     match = '// BUCKET'
     if self.content.count(match) != 1:
       raise Exception(f'Could not find "{match}" in {self.path}')
-    
+    return self.content.replace(match, bucket.to_spl())
+
+  def replace_bucket(self, bucket: Bucket, dir: Path) -> 'SPLProgram':
     return SPLProgram.create_from_content(
-      self.content.replace(match, bucket.to_spl()),
+      self.bucket_content(bucket),
       dir / (self.name + f'_bucket{bucket.id}.spl'))
   
   @staticmethod
@@ -108,7 +110,7 @@ class SPLProgram(Program):
     
     return SPLProgram.create_from_content(
       content,
-      dir / (self.name + '_unrolled.spl'))
+      dir / (self.name + f'_unrolled{number_of_unrollings_each}.spl'))
   
 class NetworkProgram(Program):
   def __init__(self, path: Path, silent: bool=False):
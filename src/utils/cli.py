@@ -3,7 +3,7 @@ from logging import debug, error, info
 from pathlib import Path
 
 from src.utils.colors import RED, ENDC
-from src.utils.flags import add_additional_flags, handle_additional_flags
+from src.utils.flags import add_additional_flags, handle_additional_flags, set_tier_budget
 from src.utils.logging import setup_logs, setup_log_levels
 from src.impacts.impacts_picker import available_analyses, default_analysis
 from src.engines.engines_picker import available_engines, default_engine
@@ -12,7 +12,6 @@ from src.engines.engines_picker import available_engines, default_engine
 TIMEOUT_SECONDS = 60
 
 def cli_helper(raw_args_without_program: list[str] | None) -> Namespace:
-  setup_logs()
   parser = ArgumentParser(
     description='Impatto, A Static Analyzer for Quantitative Input Data Usage',
     formatter_class=RawTextHelpFormatter)
@@ -24,16 +23,21 @@ def cli_helper(raw_args_without_program: list[str] | None) -> Namespace:
                       help='path to the BUCKETS.json file for output buckets')
   parser.add_argument('-d', '--debug', action='store_true',
                       help='activate debug mode')
-  parser.add_argument('-a', '--analysis', metavar='IMPACT', type=str, default=default_analysis(),
-                      help='impact analysis: ' + ', '.join(available_analyses()) + '\ndefault: ' + default_analysis())
+  parser.add_argument('-a', '--analysis', metavar='IMPACT[,IMPACT...]', type=str, default=default_analysis(),
+                      help='impact analyses, run together: ' + ', '.join(available_analyses()) + '\ndefault: ' + default_analysis())
   parser.add_argument('-e', '--engine', metavar='ENGINE', type=str, default=default_engine(),
                       help='backward engines: ' + ', '.join(available_engines()) + '\ndefault: ' + default_engine())
   parser.add_argument('-i', '--interest', metavar='VARIABLE', type=str, help='variable of interest\ndefault: all')
+  parser.add_argument('--tier-budget', metavar='SECONDS', type=float, default=TIMEOUT_SECONDS,
+                      help=f'wall-clock budget of each engine run in tiered engines (e.g., interproc-tiered)\ndefault: {TIMEOUT_SECONDS}')
   add_additional_flags(parser)
 
   args = parser.parse_args(raw_args_without_program)
+  # after parsing, --help does not need the logs
+  setup_logs()
   setup_log_levels(args.debug)
   handle_additional_flags(args)
+  set_tier_budget(args.tier_budget)
   # debug(f'CLI arguments: {raw_args_without_program}')
 
   if not args.program.exists():
@@ -45,11 +49,24 @@ def cli_helper(raw_args_without_program: list[str] | None) -> Namespace:
   if not args.buckets.exists():
     raise Exception(f'Buckets file {RED}{args.buckets.name}{ENDC} does not exist')
 
-  if args.analysis not in available_analyses():
-    raise Exception(f'Analysis {RED}{args.analysis}{ENDC} not supported, please choose one of: {", ".join(available_analyses())}')
+  for analysis in args.analysis.split(','):
+    if analysis not in available_analyses():
+      raise Exception(f'Analysis {RED}{analysis}{ENDC} not supported, please choose one of: {", ".join(available_analyses())}')
 
   if args.engine not in available_engines():
     raise Exception(f'Engine {RED}{args.engine}{ENDC} not supported, please choose one of: {", ".join(available_engines())}')
 
+  if args.load_preconditions and not args.load_preconditions.exists():
+    raise Exception(f'Preconditions file {RED}{args.load_preconditions.name}{ENDC} does not exist')
+
+  if args.jobs < 1:
+    raise Exception(f'Number of jobs {RED}{args.jobs}{ENDC} must be at least 1')
+
+  if args.clique_time_limit is not None and args.clique_time_limit <= 0:
+    raise Exception(f'Clique time limit {RED}{args.clique_time_limit}{ENDC} must be positive')
+
+  if args.samples < 1:
+    raise Exception(f'Number of samples {RED}{args.samples}{ENDC} must be at least 1')
+
   debug("Debugging mode on")
   return args
@@ -0,0 +1,104 @@
+""" Maximum cliques of small dense graphs, by branch and bound.
+
+Graphs are lists of bitsets, adjacency[v] having bit u set when u and v are
+adjacent. Branches are pruned with the number of colours of a greedy
+colouring of the candidates, since a clique takes at most one vertex of
+each colour. The search can be given a time budget, after which it stops
+with the best clique found so far and an upper bound on the maximum size.
+"""
+from time import monotonic
+
+
+TIME_LIMIT: float | None = None
+
+def set_clique_time_limit(seconds: float | None) -> None:
+  global TIME_LIMIT
+  TIME_LIMIT = seconds
+
+def get_clique_time_limit() -> float | None:
+  return TIME_LIMIT
+
+class OutOfTime(Exception):
+  pass
+
+def adjacency(n: int, edges: list[tuple[int, int]]) -> list[int]:
+  """ Bitset adjacency of the graph with vertices 0, ..., n-1 """
+  acc = [0] * n
+  for i, j in edges:
+    if i != j:
+      acc[i] |= 1 << j
+      acc[j] |= 1 << i
+  return acc
+
+def vertices(bits: int) -> list[int]:
+  acc = []
+  while bits:
+    lowest = bits & -bits
+    acc.append(lowest.bit_length() - 1)
+    bits ^= lowest
+  return acc
+
+def colour_classes(adjacency: list[int], candidates: int) -> tuple[list[int], list[int]]:
+  """ Candidates sorted by the colour of a greedy colouring, with the number
+  of colours used up to each of them """
+  order, colours = [], []
+  uncoloured, colour = candidates, 0
+  while uncoloured:
+    colour += 1
+    available = uncoloured
+    while available:
+      v = (available & -available).bit_length() - 1
+      available &= ~adjacency[v] & ~(1 << v)
+      uncoloured &= ~(1 << v)
+      order.append(v)
+      colours.append(colour)
+  return order, colours
+
+def expand(adjacency: list[int], clique: list[int], candidates: int, best: list[int], deadline: float | None) -> None:
+  order, colours = colour_classes(adjacency, candidates)
+  # the last vertices have the most colours left, start from them
+  for v, colour in zip(reversed(order), reversed(colours)):
+    if len(clique) + colour <= len(best):
+      return
+    if deadline is not None and monotonic() > deadline:
+      raise OutOfTime()
+    clique.append(v)
+    remaining = candidates & adjacency[v]
+    if remaining:
+      expand(adjacency, clique, remaining, best, deadline)
+    elif len(clique) > len(best):
+      best[:] = clique
+    clique.pop()
+    candidates &= ~(1 << v)
+
+def max_clique(adjacency: list[int], candidates: int | None = None, seconds: float | None = None) -> tuple[list[int], int]:
+  """ A largest clique among the candidates (all vertices by default), and an
+  upper bound on its size, equal to its size unless the time ran out """
+  candidates = (1 << len(adjacency)) - 1 if candidates is None else candidates
+  seconds = get_clique_time_limit() if seconds is None else seconds
+  deadline = monotonic() + seconds if seconds is not None else None
+  best: list[int] = []
+  order, colours = colour_classes(adjacency, candidates)
+  for v, colour in zip(reversed(order), reversed(colours)):
+    if colour <= len(best):
+      break
+    try:
+      remaining = candidates & adjacency[v]
+      if remaining:
+        expand(adjacency, [v], remaining, best, deadline)
+      elif len(best) == 0:
+        best[:] = [v]
+    except OutOfTime:
+      # the vertices left, this one included, have at most this many colours
+      return best, colour
+    candidates &= ~(1 << v)
+  return best, len(best)
+
+def max_clique_each_vertex(adjacency: list[int], seconds: float | None = None) -> dict[int, tuple[list[int], int]]:
+  """ For each vertex, a largest clique containing it and an upper bound on
+  its size, the time budget holding for each vertex """
+  acc = {}
+  for v in range(len(adjacency)):
+    clique, upper = max_clique(adjacency, adjacency[v], seconds)
+    acc[v] = ([v, *clique], upper + 1)
+  return acc
@@ -1,16 +1,58 @@
 
 
 from argparse import ArgumentParser
+from pathlib import Path
 
+from src.abstract_domains.feasibility import DEFAULT_FEASIBILITY_CACHE_SIZE, FeasibilityCache, set_feasibility_cache
+from src.abstract_domains.poly import get_minimize_threshold, set_minimize_lp, set_minimize_threshold
+from src.abstract_domains.volume import DEFAULT_SAMPLES, set_samples
+from src.engines.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB, EngineCache, set_engine_cache
+from src.utils.cliques import get_clique_time_limit, set_clique_time_limit
+from src.utils.lp import available_lp_backends, get_lp_backends, get_lp_time_limit, set_lp_backends, set_lp_time_limit
+from src.utils.parallel import set_workers
 from src.utils.progress_bar import set_show_progress_bar
+from src.utils.scratch import set_scratch_root
 
 
 OLDER_ALGORITHM = True
+TIER_BUDGET: float | None = None
 
 
 def add_additional_flags(parser: ArgumentParser) -> None:
   parser.add_argument('--progress-bar', action='store_true',
                       help='show progress bar')
+  parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                      help='number of worker processes running the backward engine and the analyses, one variable per worker (or the feasibility checks of a single variable)\ndefault: 1')
+  parser.add_argument('--no-cache', action='store_true',
+                      help='always run the backward engine, ignoring cached preconditions')
+  parser.add_argument('--cache-dir', metavar='DIR', type=Path, default=DEFAULT_CACHE_DIR,
+                      help=f'directory of the precondition cache\ndefault: {DEFAULT_CACHE_DIR}')
+  parser.add_argument('--cache-size', metavar='MB', type=int, default=DEFAULT_CACHE_SIZE_MB,
+                      help=f'maximum size of the precondition cache, least recently used entries are evicted first\ndefault: {DEFAULT_CACHE_SIZE_MB}')
+  parser.add_argument('--scratch-dir', metavar='DIR', type=Path, default=None,
+                      help='where to create the private working directory of this run\ndefault: /dev/shm if available, otherwise the system temporary directory')
+  parser.add_argument('--keep-scratch', action='store_true',
+                      help='do not remove the working directory (instrumented programs, engine configurations) at exit')
+  parser.add_argument('--dump-preconditions', metavar='FILE', type=Path, default=None,
+                      help='write the preconditions computed by the engine to FILE (binary interchange format)')
+  parser.add_argument('--load-preconditions', metavar='FILE', type=Path, default=None,
+                      help='read the preconditions from FILE instead of running the engine')
+  parser.add_argument('--minimize-rows', metavar='N', type=int, default=get_minimize_threshold(),
+                      help=f'remove duplicated and redundant constraints from the polyhedra with more than N rows\nafter eliminations and intersections, 0 never\ndefault: {get_minimize_threshold()}')
+  parser.add_argument('--minimize-lp', action='store_true',
+                      help='when minimizing, also remove the constraints implied by the others, with one LP per constraint')
+  parser.add_argument('--lp-backend', metavar='NAME[,NAME...]', type=str, default=','.join(get_lp_backends()),
+                      help=f'LP solvers to try in order: {", ".join(available_lp_backends())}\ndefault: {",".join(get_lp_backends())}')
+  parser.add_argument('--lp-time-limit', metavar='SECONDS', type=float, default=get_lp_time_limit(),
+                      help=f'time limit of each LP solver call\ndefault: {get_lp_time_limit()}')
+  parser.add_argument('--clique-time-limit', metavar='SECONDS', type=float, default=get_clique_time_limit(),
+                      help='time limit of each largest clique search (e.g., outcomes analysis), past which the analysis reports an upper bound\ndefault: none')
+  parser.add_argument('--lp-stats', action='store_true',
+                      help='report calls and time spent in each LP solver, and feasibility cache hits, at the end')
+  parser.add_argument('--feasibility-cache', metavar='N', type=int, default=DEFAULT_FEASIBILITY_CACHE_SIZE,
+                      help=f'remember the outcome of the last N feasibility checks, 0 never\ndefault: {DEFAULT_FEASIBILITY_CACHE_SIZE}')
+  parser.add_argument('--samples', metavar='N', type=int, default=DEFAULT_SAMPLES,
+                      help=f'points drawn to estimate volumes (e.g., volume analysis)\ndefault: {DEFAULT_SAMPLES}')
   # parser.add_argument('--changes-fast', action='store_true'
   #                     , help='use the new fast changes algorithm')
   
@@ -18,7 +60,24 @@ def handle_additional_flags(args) -> None:
   global OLDER_ALGORITHM
   
   set_show_progress_bar(args.progress_bar)
+  set_scratch_root(args.scratch_dir, args.keep_scratch)
+  set_engine_cache(None if args.no_cache else EngineCache(args.cache_dir, args.cache_size << 20))
+  set_minimize_threshold(args.minimize_rows if args.minimize_rows > 0 else None)
+  set_minimize_lp(args.minimize_lp)
+  set_lp_backends(args.lp_backend.split(','))
+  set_lp_time_limit(args.lp_time_limit)
+  set_clique_time_limit(args.clique_time_limit)
+  set_feasibility_cache(FeasibilityCache(args.feasibility_cache) if args.feasibility_cache > 0 else None)
+  set_samples(args.samples)
+  set_workers(args.jobs)
   # OLDER_ALGORITHM = not args.changes_fast
 
 def get_older_algorithm() -> bool:
   return OLDER_ALGORITHM
+
+def set_tier_budget(seconds: float | None) -> None:
+  global TIER_BUDGET
+  TIER_BUDGET = seconds
+
+def get_tier_budget() -> float | None:
+  return TIER_BUDGET
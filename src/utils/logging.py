@@ -1,11 +1,10 @@
 import logging
-import colorlog
-import networkx as nx
 
 # Set the logging level to suppress networkx log messages
 logging.getLogger("numexpr").setLevel(logging.CRITICAL)
 
 def setup_logs():
+  import colorlog
   formatter = colorlog.ColoredFormatter(
     '%(log_color)s%(levelname)s:%(reset)s %(message)s',
     log_colors={
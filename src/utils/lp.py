@@ -1,42 +1,26 @@
-import numpy as np
-from scipy.optimize import linprog
-from typing import Callable
+from contextlib import contextmanager
+from importlib.util import find_spec
 from logging import warning
-import pulp
-import gurobipy as gb
-from gurobipy import GRB
+from time import perf_counter
+from typing import Callable, Iterator
+
+import numpy as np
 
-from scipy.linalg import LinAlgWarning
 import warnings
-warnings.filterwarnings(action='ignore', category=LinAlgWarning, module='scipy')
 warnings.filterwarnings(action='ignore', category=RuntimeWarning, module='scipy')
 warnings.filterwarnings(action='ignore', category=Warning)
 
 class SolverError(Exception):
   pass
 
-def timeout(seconds):
-  def decorate(func):
-    def wrapper(*args, **kwargs):
-      import signal
-      def handler(signum, frame):
-        raise TimeoutError()
-      signal.signal(signal.SIGALRM, handler)
-      signal.alarm(seconds)
-      try:
-        result = func(*args, **kwargs)
-      except TimeoutError:
-        result = None
-      finally:
-        signal.alarm(0)
-      return result
-    return wrapper
-  return decorate
+# a backend returns (True, x) for a feasible problem, (False, []) for an
+# infeasible one and None when it cannot tell (time limit, numerical issues)
+Backend = Callable[[np.ndarray, np.ndarray, np.ndarray, float], None | tuple[bool, np.ndarray]]
 
 class Scheduler:
   def __init__(self):
     self.tasks: list[Callable[[np.ndarray, np.ndarray, np.ndarray], None | tuple[bool, np.ndarray]]] = []
-    
+
   def schedule(self, task: Callable[[np.ndarray, np.ndarray, np.ndarray], None | tuple[bool, np.ndarray]]) -> 'Scheduler':
     self.tasks.append(task)
     return self
@@ -46,64 +30,248 @@ class Scheduler:
     for task in self.tasks:
       try:
         result = task(obj, A, b)
-      except ValueError as e:
-        warning(f'ValueError: {e}')
+      except Exception as e:
+        warning(f'{e.__class__.__name__}: {e}')
         result = None
       if result is not None and result[0]:
         return result
       if result is not None and not result[0]:
         at_least_one_false = True
     return (None if not at_least_one_false else False), np.array([])
-    
 
-SECONDS = 10
 
-@timeout(SECONDS)
-def scipy_solve_interior_point(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> tuple[bool, np.ndarray]:
-  result = linprog(c=obj, A_ub=A, b_ub=b, bounds=(-100000, 100000), method='interior-point')
-  return result.success, result.x
+SECONDS = 10
+BOUNDS = (-100000, 100000)
 
-@timeout(SECONDS)
-def scipy_solve_simplex(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> tuple[bool, np.ndarray]:
-  result = linprog(c=obj, A_ub=A, b_ub=b, bounds=(-100000, 100000), method='revised simplex')
-  return result.success, result.x
+def highs(obj: np.ndarray, A: np.ndarray, b: np.ndarray, time_limit: float) -> None | tuple[bool, np.ndarray]:
+  from scipy.optimize import linprog
+  result = linprog(c=obj, A_ub=A, b_ub=b, bounds=BOUNDS, method='highs', options={'time_limit': time_limit})
+  if result.status == 0:
+    return True, result.x
+  if result.status == 2:
+    return False, np.array([])
+  return None
 
-@timeout(SECONDS)
-def pulp_solve(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> tuple[bool, np.ndarray]:
-  lp_problem = pulp.LpProblem("Matrix_LP_Problem", pulp.LpMaximize)
+def pulp_solve(obj: np.ndarray, A: np.ndarray, b: np.ndarray, time_limit: float) -> None | tuple[bool, np.ndarray]:
+  import pulp
+  lp_problem = pulp.LpProblem("Matrix_LP_Problem", pulp.LpMinimize)
   num_variables = len(obj)
-  variables = [pulp.LpVariable(f"x{i}", lowBound=0) for i in range(1, num_variables + 1)]
+  variables = [pulp.LpVariable(f"x{i}", lowBound=BOUNDS[0], upBound=BOUNDS[1]) for i in range(1, num_variables + 1)]
   lp_problem += pulp.lpDot(obj, variables), "Z"
   for i in range(len(A)):
     lp_problem += pulp.lpDot(A[i], variables) <= b[i], f"Constraint_{i + 1}"
-  solver = pulp.getSolver('COIN_CMD', msg=0, timeLimit=SECONDS)
+  solver = pulp.getSolver('PULP_CBC_CMD', msg=0, timeLimit=time_limit)
   lp_problem.solve(solver)
-  return lp_problem.status == 1, np.array([x.varValue for x in variables])
+  if lp_problem.status == pulp.LpStatusOptimal:
+    return True, np.array([x.varValue for x in variables])
+  if lp_problem.status == pulp.LpStatusInfeasible:
+    return False, np.array([])
+  return None
 
-@timeout(SECONDS)
-def gurobi(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> tuple[bool, np.ndarray]:
-  # def solve(self, obj, sense, bbox=DEFAULT_BBOX):
-  bbox = (-100000, 100000)
+def gurobi(obj: np.ndarray, A: np.ndarray, b: np.ndarray, time_limit: float) -> None | tuple[bool, np.ndarray]:
+  import gurobipy as gb
   nvars = len(obj)
-  # status, objval, xval
   with gb.Env(empty=True) as env:
     env.setParam('OutputFlag', 0)
     env.start()
     with gb.Model(env=env) as m:
-      x = m.addMVar(nvars, lb=bbox[0], ub=bbox[1])
+      m.setParam('TimeLimit', time_limit)
+      x = m.addMVar(nvars, lb=BOUNDS[0], ub=BOUNDS[1])
       m.addConstr(A @ x <= b)
-      m.setObjective(obj @ x, GRB.MINIMIZE)
+      m.setObjective(obj @ x, gb.GRB.MINIMIZE)
       m.optimize()
-      return m.status == GRB.OPTIMAL, x.X if m.status == GRB.OPTIMAL else np.array([])
+      if m.status == gb.GRB.OPTIMAL:
+        return True, x.X
+      if m.status == gb.GRB.INFEASIBLE:
+        return False, np.array([])
+      return None
+
+# add here all available backends, together with the module they need
+BACKENDS: dict[str, tuple[Backend, str]] = {
+  'highs': (highs, 'scipy'),
+  'pulp': (pulp_solve, 'pulp'),
+  'gurobi': (gurobi, 'gurobipy'),
+}
+LP_BACKENDS = ['highs']
+
+class BackendStats:
+  def __init__(self):
+    self.calls = 0
+    self.feasible = 0
+    self.infeasible = 0
+    self.failed = 0
+    self.seconds = 0.
+
+  def record(self, result: None | tuple[bool, np.ndarray], seconds: float) -> None:
+    self.calls += 1
+    self.seconds += seconds
+    if result is None:
+      self.failed += 1
+    elif result[0]:
+      self.feasible += 1
+    else:
+      self.infeasible += 1
+
+  def merge(self, other: 'BackendStats') -> None:
+    self.calls += other.calls
+    self.feasible += other.feasible
+    self.infeasible += other.infeasible
+    self.failed += other.failed
+    self.seconds += other.seconds
+
+  def __str__(self):
+    average = self.seconds / self.calls * 1000 if self.calls > 0 else 0
+    return f'{self.calls} calls ({self.feasible} feasible, {self.infeasible} infeasible, {self.failed} failed) in {self.seconds:.3f}s, {average:.3f}ms per call'
+
+STATS = {name: BackendStats() for name in BACKENDS}
+# backends that raised already, warned about once
+FAILING: set[str] = set()
+
+def available_lp_backends() -> list[str]:
+  return [name for name, (_, module) in BACKENDS.items() if find_spec(module) is not None]
+
+def set_lp_backends(names: list[str]) -> None:
+  global LP_BACKENDS
+  for name in names:
+    if name not in available_lp_backends():
+      raise Exception(f'LP backend {name} not available, please choose among: {", ".join(available_lp_backends())}')
+  LP_BACKENDS = names
+
+def get_lp_backends() -> list[str]:
+  return LP_BACKENDS
+
+def set_lp_time_limit(seconds: float) -> None:
+  global SECONDS
+  SECONDS = seconds
+
+def get_lp_time_limit() -> float:
+  return SECONDS
+
+def get_lp_stats() -> dict[str, BackendStats]:
+  return STATS
+
+def reset_lp_stats() -> None:
+  for name in STATS:
+    STATS[name] = BackendStats()
+
+def merge_lp_stats(stats: dict[str, BackendStats]) -> None:
+  for name, other in stats.items():
+    STATS[name].merge(other)
+
+def lp_stats_report() -> str:
+  return '\n'.join(f'{name}: {stats}' for name, stats in STATS.items() if stats.calls > 0)
+
+def measured(name: str) -> Callable[[np.ndarray, np.ndarray, np.ndarray], None | tuple[bool, np.ndarray]]:
+  backend, _ = BACKENDS[name]
+  def task(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> None | tuple[bool, np.ndarray]:
+    start = perf_counter()
+    result = None
+    try:
+      result = backend(obj, A, b, SECONDS)
+    except Exception as e:
+      # e.g., a missing license or a crashed solver, the next backend takes over
+      if name not in FAILING:
+        warning(f'LP backend {name} failed, trying the next one: {e.__class__.__name__}: {e}')
+      FAILING.add(name)
+    finally:
+      STATS[name].record(result, perf_counter() - start)
+    return result
+  return task
 
 def solve(obj: np.ndarray, A: np.ndarray, b: np.ndarray) -> tuple[bool, np.ndarray]:
-  success, value = Scheduler() \
-    .schedule(scipy_solve_interior_point) \
-    .schedule(scipy_solve_simplex) \
-    .call(obj, A, b)
+  scheduler = Scheduler()
+  for name in LP_BACKENDS:
+    scheduler.schedule(measured(name))
+  success, value = scheduler.call(obj, A, np.asarray(b).reshape(-1))
   if success is None:
     warning('All solvers failed, raising top.')
     raise SolverError()
-    return False, value
   return success, value
-  
\ No newline at end of file
+
+def highs_model(A: np.ndarray, b: np.ndarray):
+  import highspy
+  model = highspy.Highs()
+  model.setOptionValue('output_flag', False)
+  n = A.shape[1]
+  model.addVars(n, np.full(n, float(BOUNDS[0])), np.full(n, float(BOUNDS[1])))
+  add_highs_rows(model, A, b)
+  return model
+
+def add_highs_rows(model, A: np.ndarray, b: np.ndarray) -> None:
+  import highspy
+  # row-wise sparse format
+  rows, columns = np.nonzero(A)
+  starts = np.searchsorted(rows, np.arange(len(A)))
+  model.addRows(
+    len(A), np.full(len(A), -highspy.kHighsInf), b.astype(float),
+    len(rows), starts.astype(np.int32), columns.astype(np.int32), A[rows, columns].astype(float))
+
+def highs_model_solve(model, obj: np.ndarray, time_limit: float) -> None | tuple[bool, np.ndarray]:
+  import highspy
+  model.setOptionValue('time_limit', float(time_limit))
+  model.changeColsCost(len(obj), np.arange(len(obj), dtype=np.int32), obj.astype(float))
+  model.run()
+  status = model.getModelStatus()
+  if status == highspy.HighsModelStatus.kOptimal:
+    return True, np.array(model.getSolution().col_value)
+  if status == highspy.HighsModelStatus.kInfeasible:
+    return False, np.array([])
+  return None
+
+class Session:
+  """ LPs over a base system A x <= b together with blocks of rows pushed
+  and popped on top of it, e.g., a polyhedron intersected in turn with many
+  others.
+
+  With highspy installed and highs as the first backend, the HiGHS model is
+  built on the first solve and kept: the base rows are loaded once, pushed
+  and popped blocks only add and delete their rows, and each solve starts
+  from the basis of the previous one. Otherwise, or if that fails, each
+  solve stacks the rows and goes through solve.
+  """
+  def __init__(self, A: np.ndarray, b: np.ndarray):
+    self.A = A
+    self.b = np.asarray(b).reshape(-1)
+    self.blocks: list[tuple[np.ndarray, np.ndarray]] = []
+    self.incremental = find_spec('highspy') is not None and LP_BACKENDS[0] == 'highs'
+    self.model = None
+
+  def push(self, A: np.ndarray, b: np.ndarray) -> None:
+    self.blocks.append((A, np.asarray(b).reshape(-1)))
+    if self.model is not None:
+      add_highs_rows(self.model, *self.blocks[-1])
+
+  def pop(self) -> None:
+    A, _ = self.blocks.pop()
+    if self.model is not None:
+      end = len(self.b) + sum(len(block) for block, _ in self.blocks) + len(A)
+      self.model.deleteRows(len(A), np.arange(end - len(A), end, dtype=np.int32))
+
+  @contextmanager
+  def pushed(self, A: np.ndarray, b: np.ndarray) -> Iterator['Session']:
+    self.push(A, b)
+    try:
+      yield self
+    finally:
+      self.pop()
+
+  def solve(self, obj: np.ndarray) -> tuple[bool, np.ndarray]:
+    if self.incremental:
+      start = perf_counter()
+      result = None
+      try:
+        if self.model is None:
+          self.model = highs_model(self.A, self.b)
+          for A, b in self.blocks:
+            add_highs_rows(self.model, A, b)
+        result = highs_model_solve(self.model, obj, SECONDS)
+      except Exception as e:
+        warning(f'Incremental HiGHS session failed, stacking the rows instead: {e}')
+        self.incremental, self.model = False, None
+      finally:
+        STATS['highs'].record(result, perf_counter() - start)
+      if result is not None:
+        return result
+    A = np.vstack([self.A] + [A for A, _ in self.blocks])
+    b = np.concatenate([self.b] + [b for _, b in self.blocks])
+    return solve(obj, A, b)
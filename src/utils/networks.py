@@ -80,7 +80,7 @@ class NN(list):
       weights.append(np.array(w))
     for b in biases_list:
       biases.append(np.array(b))
-    activations = [NN.RELU for _ in biases] + [NN.AFFINE]
+    activations = [NN.RELU for _ in biases[:-1]] + [NN.AFFINE]
     return NN(weights, biases, activations)
 
   def output_space_composition(self, l:int, u:int, ntests:int=100000) -> dict[int,int]:
@@ -0,0 +1,108 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import logging
+from multiprocessing.util import Finalize
+import os
+from typing import Any, Callable, Iterable, Iterator
+
+from src.abstract_domains.feasibility import get_feasibility_stats, merge_feasibility_stats, reset_feasibility_stats
+from src.utils.cliques import get_clique_time_limit, set_clique_time_limit
+from src.utils.lp import BackendStats, get_lp_backends, get_lp_stats, get_lp_time_limit, merge_lp_stats, reset_lp_stats, set_lp_backends, set_lp_time_limit
+from src.utils.progress_bar import get_show_progress_bar, set_show_progress_bar
+from src.utils.scratch import scratch_dir, set_scratch_dir
+from src.utils.string import get_variable_mapping, update_variable_mapping
+
+
+WORKERS = 1
+# what the chunks of imap_chunks refer to, set once in each worker
+SHARED: Any = None
+
+def set_workers(workers: int) -> None:
+  global WORKERS
+  WORKERS = workers
+
+def get_workers() -> int:
+  return WORKERS
+
+def snapshot_state() -> dict[str, Any]:
+  # process-wide state that workers need to behave like the parent process
+  return {
+    'mapping': get_variable_mapping(),
+    'progress_bar': get_show_progress_bar(),
+    'log_level': logging.getLogger().level,
+    'scratch_dir': scratch_dir(),
+    'lp_backends': get_lp_backends(),
+    'lp_time_limit': get_lp_time_limit(),
+    'clique_time_limit': get_clique_time_limit(),
+  }
+
+def restore_state(state: dict[str, Any]) -> None:
+  update_variable_mapping(state['mapping'])
+  set_show_progress_bar(state['progress_bar'])
+  logging.getLogger().setLevel(state['log_level'])
+  set_lp_backends(state['lp_backends'])
+  set_lp_time_limit(state['lp_time_limit'])
+  set_clique_time_limit(state['clique_time_limit'])
+
+def _initialize_worker(state: dict[str, Any]) -> None:
+  restore_state(state)
+  # workers do not start pools of their own
+  set_workers(1)
+  # each worker writes its instrumented programs in its own subdirectory
+  set_scratch_dir(state['scratch_dir'] / f'worker-{os.getpid()}')
+
+def _call(func: Callable[[Any], Any], item: Any) -> tuple[Any, dict[str, str], dict[str, BackendStats], tuple[int, int]]:
+  # the worker may extend the variable mapping while parsing, solve LPs and
+  # look them up in its feasibility cache, ship all of them back
+  reset_lp_stats()
+  reset_feasibility_stats()
+  return func(item), get_variable_mapping(), get_lp_stats(), get_feasibility_stats()
+
+def _merge(mapping: dict[str, str], lp_stats: dict[str, BackendStats], feasibility_stats: tuple[int, int]) -> None:
+  update_variable_mapping(mapping)
+  merge_lp_stats(lp_stats)
+  merge_feasibility_stats(feasibility_stats)
+
+def _initialize_shared_worker(state: dict[str, Any], shared: Any) -> None:
+  global SHARED
+  _initialize_worker(state)
+  SHARED = shared
+  # what the shared object opens in this worker (e.g., an engine worker) is closed when the pool shuts it down
+  if hasattr(shared, 'close'):
+    Finalize(shared, shared.close, exitpriority=10)
+
+def _call_shared(func: Callable[[Any, Any], Any], chunk: Any) -> tuple[Any, dict[str, str], dict[str, BackendStats], tuple[int, int]]:
+  return _call(lambda c: func(SHARED, c), chunk)
+
+def imap_chunks(func: Callable[[Any, Any], Any], shared: Any, chunks: Iterable[Any], workers: int | None = None) -> Iterator[Any]:
+  """ Yield func(shared, chunk) for each chunk, in order, computed over a
+  pool of worker processes.
+
+  shared is sent once to each worker, the chunks should only refer to it
+  (e.g., by indices) so that they are cheap to send. Chunks are taken from
+  the iterable only a few at a time, so that they can depend on the results
+  yielded so far, and closing the iterator early cancels the ones not
+  started yet. With a single worker everything runs in the current process.
+  """
+  workers = get_workers() if workers is None else workers
+  if workers <= 1:
+    for chunk in chunks:
+      yield func(shared, chunk)
+    return
+
+  pool = ProcessPoolExecutor(
+    max_workers=workers,
+    initializer=_initialize_shared_worker,
+    initargs=(snapshot_state(), shared))
+  try:
+    chunks = iter(chunks)
+    pending = deque(pool.submit(_call_shared, func, chunk) for chunk in islice(chunks, 2 * workers))
+    while len(pending) > 0:
+      result, *stats = pending.popleft().result()
+      _merge(*stats)
+      yield result
+      for chunk in islice(chunks, 1):
+        pending.append(pool.submit(_call_shared, func, chunk))
+  finally:
+    pool.shutdown(wait=True, cancel_futures=True)
@@ -1,19 +1,36 @@
+SHOW_PROGRESS_BAR: bool = False
 
+class Silent:
+  """ What progress_bar returns when hidden, without importing tqdm: the
+  iterable as it is, and the tqdm methods called on it doing nothing """
+  def __init__(self, iterable=None, *args, **kwargs):
+    self.iterable = iterable
 
-from tqdm import tqdm
+  def __iter__(self):
+    return iter(self.iterable if self.iterable is not None else [])
 
+  def set_description(self, *args, **kwargs) -> None:
+    pass
 
-SHOW_PROGRESS_BAR: bool = False
+  def update(self, *args, **kwargs) -> None:
+    pass
+
+  def close(self) -> None:
+    pass
 
 def progress_bar(*args, **kwargs):
   if SHOW_PROGRESS_BAR:
+    from tqdm import tqdm
     return tqdm(*args, **kwargs)
   else:
-    return tqdm(*args, **kwargs, disable=True)
+    return Silent(*args, **kwargs)
   
 def subprogress_bar(*args, **kwargs):
   return progress_bar(leave=False, *args, **kwargs)
 
 def set_show_progress_bar(show: bool) -> None:
   global SHOW_PROGRESS_BAR
-  SHOW_PROGRESS_BAR = show
\ No newline at end of file
+  SHOW_PROGRESS_BAR = show
+
+def get_show_progress_bar() -> bool:
+  return SHOW_PROGRESS_BAR
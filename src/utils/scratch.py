@@ -0,0 +1,42 @@
+import atexit
+from logging import debug
+import os
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+
+
+SCRATCH_ROOT: Path | None = None
+SCRATCH_DIR: Path | None = None
+KEEP_SCRATCH: bool = False
+
+def default_scratch_root() -> Path | None:
+  # prefer tmpfs, engines write and read back every instrumented program
+  shm = Path('/dev/shm')
+  if shm.is_dir() and os.access(shm, os.W_OK):
+    return shm
+  return None
+
+def scratch_dir() -> Path:
+  """ Private working directory of this run, removed at exit """
+  global SCRATCH_DIR
+  if SCRATCH_DIR is None:
+    root = SCRATCH_ROOT or default_scratch_root()
+    if root is not None:
+      root.mkdir(parents=True, exist_ok=True)
+    SCRATCH_DIR = Path(mkdtemp(prefix='impatto-', dir=root))
+    debug(f'Scratch directory "{SCRATCH_DIR}"')
+    if not KEEP_SCRATCH:
+      atexit.register(rmtree, SCRATCH_DIR, ignore_errors=True)
+  return SCRATCH_DIR
+
+def set_scratch_dir(path: Path) -> None:
+  # used by workers, the owner of the parent directory takes care of the cleanup
+  global SCRATCH_DIR
+  path.mkdir(parents=True, exist_ok=True)
+  SCRATCH_DIR = path
+
+def set_scratch_root(root: Path | None, keep: bool = False) -> None:
+  global SCRATCH_ROOT, KEEP_SCRATCH
+  SCRATCH_ROOT = root
+  KEEP_SCRATCH = keep
@@ -19,6 +19,18 @@ def from_harmonic_to_variable(harmonic: str) -> str:
       return variable
   raise Exception(f"Unknown harmonic: {harmonic}")
 
+def get_variable_mapping() -> dict[str, str]:
+  return dict(VARIABLE_MAPPING)
+
+def update_variable_mapping(mapping: dict[str, str]) -> None:
+  global VARIABLE_MAPPING
+  for variable, harmonic in mapping.items():
+    if VARIABLE_MAPPING.get(variable, harmonic) != harmonic:
+      raise Exception(f"Conflicting harmonic for {variable}: {VARIABLE_MAPPING[variable]} and {harmonic}")
+    if variable not in VARIABLE_MAPPING and harmonic in VARIABLE_MAPPING.values():
+      raise Exception(f"Harmonic {harmonic} already taken, cannot map {variable}")
+    VARIABLE_MAPPING[variable] = harmonic
+
 def from_dash_to_uppercase(name: str) -> str:
   return "".join([word.capitalize() for word in name.split("-")])
 
@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from src.engines.cache import tree_digest
+
+
+def test_tree_digest_covers_every_source_file(tmp_path: Path):
+  (tmp_path / 'main.py').write_text('import helpers\n')
+  (tmp_path / 'lib').mkdir()
+  (tmp_path / 'lib' / 'helpers.py').write_text('x = 1\n')
+  before = tree_digest(tmp_path)
+  (tmp_path / 'notes.txt').write_text('not a source file\n')
+  assert tree_digest(tmp_path) == before
+  (tmp_path / 'lib' / 'helpers.py').write_text('x = 2\n')
+  assert tree_digest(tmp_path) != before
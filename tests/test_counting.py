@@ -0,0 +1,31 @@
+from itertools import product
+
+import numpy as np
+
+from src.abstract_domains.counting import count_integer_points
+
+
+def brute_force(A: np.ndarray, b: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> int:
+  ranges = [range(int(np.ceil(l)), int(np.floor(u)) + 1) for l, u in zip(lower, upper)]
+  return sum(bool(np.all(A @ np.array(x) <= b + 1e-9)) for x in product(*ranges))
+
+def test_single_variable_rows_narrow_a_loose_box():
+  # 2 x <= -4 leaves nothing in 0..7
+  assert count_integer_points(np.array([[2.]]), np.array([-4.]), np.array([0.]), np.array([7.])) == 0
+  # 0 <= x <= 3, y - x <= 0 over the box 0..7 squared
+  A = np.array([[1., 0.], [-1., 0.], [-1., 1.]])
+  assert count_integer_points(A, np.array([3., 0., 0.]), np.zeros(2), np.full(2, 7.)) == 10
+
+def test_rows_over_no_variable():
+  A = np.array([[0., 0.], [1., 1.]])
+  assert count_integer_points(A, np.array([-1., 3.]), np.zeros(2), np.full(2, 5.)) == 0
+  assert count_integer_points(A, np.array([1., 3.]), np.zeros(2), np.full(2, 5.)) == 10
+
+def test_against_enumeration():
+  rng = np.random.default_rng(0)
+  for _ in range(100):
+    n = int(rng.integers(1, 4))
+    A = rng.integers(-3, 4, size=(int(rng.integers(1, 6)), n)).astype(float)
+    b = rng.integers(-5, 10, size=len(A)).astype(float)
+    lower, upper = np.full(n, -4.), np.full(n, 6.)
+    assert count_integer_points(A, b, lower, upper) == brute_force(A, b, lower, upper)
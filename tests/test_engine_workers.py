@@ -0,0 +1,34 @@
+import os
+from pathlib import Path
+
+from src.abstract_domains.poly import Poly
+from src.buckets import Bucket
+from src.manager import run_tier_each_bucket
+
+
+class CountingEngine:
+  """ Engine starting a warm worker on its first bucket, as the
+  disjunctive-completion engine does, and logging starts and closes """
+  def __init__(self, log: Path):
+    self.log = log
+    self.owner: int | None = None
+
+  def run(self, bucket: Bucket) -> Poly:
+    if self.owner != os.getpid():
+      self.owner = os.getpid()
+      (self.log / f'start-{self.owner}').touch()
+    return Poly.top()
+
+  def close(self) -> None:
+    if self.owner == os.getpid():
+      (self.log / f'close-{self.owner}').touch()
+    self.owner = None
+
+def test_one_worker_start_per_pool_process(tmp_path: Path):
+  buckets = [Bucket(f'y == {i}', i) for i in range(6)]
+  acc = run_tier_each_bucket(CountingEngine(tmp_path), buckets, workers=2) # type: ignore
+  assert len(acc) == 6
+  starts = {p.name.removeprefix('start-') for p in tmp_path.glob('start-*')}
+  closes = {p.name.removeprefix('close-') for p in tmp_path.glob('close-*')}
+  assert 1 <= len(starts) <= 2
+  assert closes == starts
@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.abstract_domains.disjunctive_poly import DisjunctivePoly
+from src.abstract_domains.poly import Poly, intersecting_pairs, intersection_points
+from src.impacts.changes import all_intersections
+from src.impacts.intersections import CountIntersectionsAnalysis
+from src.impacts.outcomes import OutcomesAnalysis
+
+
+def square(variables: list[str], size: float = 1.) -> Poly:
+  # 0 <= v <= size for each variable
+  n = len(variables)
+  return Poly(variables, np.vstack((np.eye(n), -np.eye(n))), np.concatenate((np.full(n, size), np.zeros(n))))
+
+def test_intersection_points_with_top():
+  x = square(['a', 'b'])
+  x.add_witnesses([np.array([.5, .5])])
+  assert [len(p) for p in intersection_points(([x], [Poly.top()]), ([(0, 0)], 0))] == [0] # type: ignore
+  assert intersection_points(([x], [Poly.bottom()]), ([(0, 0)], 0)) == [None]
+
+def test_changes_with_top_disjunct():
+  # the first bucket holds a top disjunct, as loaded from the engine cache
+  first = DisjunctivePoly([square(['a', 'b']), Poly.top()])
+  second = DisjunctivePoly([square(['a', 'b'], 2.)])
+  # both disjuncts of the first bucket meet the second one
+  assert all_intersections([first, second], 'a', old=True) == 2
+  assert all_intersections([first, second], 'a') == 1
+  assert intersecting_pairs([square(['a']), Poly.top()]) == [(0, 1)]
+
+def strip(low: float, high: float) -> Poly:
+  # 0 <= a <= 1, low <= b <= high
+  return Poly(['a', 'b'], np.vstack((np.eye(2), -np.eye(2))), np.array([1., high, 0., -low]))
+
+def test_outcomes_is_the_largest_count():
+  # without a, the first three buckets meet at b = 2, the last one is apart
+  pres = [strip(0, 2), strip(1, 3), strip(2, 4), strip(5, 6)]
+  counts = CountIntersectionsAnalysis(pres, None).run('a') # type: ignore
+  assert counts == {0: 2, 1: 2, 2: 2}
+  assert OutcomesAnalysis(pres, None).run('a') == max(counts.values()) # type: ignore
+  assert OutcomesAnalysis([strip(0, 1), strip(2, 3)], None).run('a') == 0 # type: ignore
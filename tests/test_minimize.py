@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.abstract_domains.poly import Poly, get_minimize_lp, get_minimize_threshold, set_minimize_lp, set_minimize_threshold
+
+
+def diamond() -> Poly:
+  # |x| + |y| <= 1, and x + 2y <= 3 which the other rows imply
+  A = np.array([[1., 1.], [1., -1.], [-1., 1.], [-1., -1.], [1., 2.]])
+  return Poly(['x', 'y'], A, np.array([1., 1., 1., 1., 3.]))
+
+def test_minimize_lp_removes_implied_rows():
+  threshold, lp = get_minimize_threshold(), get_minimize_lp()
+  try:
+    set_minimize_threshold(2)
+    set_minimize_lp(False)
+    assert len(diamond().minimize_above_threshold().b) == 5
+    set_minimize_lp(True)
+    minimized = diamond().minimize_above_threshold()
+    assert len(minimized.b) == 4
+    assert minimized.contains(np.array([.5, .5])) and not minimized.contains(np.array([1., 1.]))
+  finally:
+    set_minimize_threshold(threshold)
+    set_minimize_lp(lp)
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from src.abstract_domains.parser import parse_linear_constraints
+
+
+def test_mixed_aligned_and_other_rows():
+  # the second row skips y and the third one is in the interproc style, so
+  # the block cannot take the aligned path
+  constraints = [
+    '-0.2356x -0.3880y 0.0z <= 0.6527',
+    '0.5x 0.25z <= 1',
+    'x + -y >= -2',
+    '-x - -z <= 3',
+  ]
+  A, b = parse_linear_constraints(['x', 'y', 'z'], constraints)
+  assert np.allclose(A, [[-0.2356, -0.3880, 0.], [0.5, 0., 0.25], [-1., 1., 0.], [-1., 0., 1.]])
+  assert np.allclose(b, [0.6527, 1., 2., 3.])
+
+def test_missing_operator():
+  # a term right after another one, with neither a sign nor a space
+  with pytest.raises(Exception, match='Missing operator'):
+    parse_linear_constraints(['x', 'y'], ['x.5 <= 1'])